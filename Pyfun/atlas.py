@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from textures import display_convert
+
+def _quantize(v, step):
+    return min(255, max(0, int(round(v / step)) * step))
+
+class _CacheStats:
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def memory_bytes(self):
+        return sum(s.get_width() * s.get_height() * s.get_bytesize() for s in self.sprites.values())
+
+    def stats(self):
+        return {"sprites": len(self.sprites), "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hit_rate(), "bytes": self.memory_bytes()}
+
+class SpriteAtlas(_CacheStats):
+    def __init__(self, color_step=4, alpha_step=8):
+        self.color_step = color_step
+        self.alpha_step = alpha_step
+        self.sprites = {}
+        self.resolved = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _color(self, color):
+        return tuple(_quantize(c, self.color_step) for c in color[:3])
+
+    def _resolve(self, raw, key, build):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            sprite = display_convert(build(*key[1:]), alpha=True)
+            self.sprites[key] = sprite
+        else:
+            self.hits += 1
+        self.resolved[raw] = sprite
+        return sprite
+
+    def glow(self, color, max_radius, steps=6, alpha_start=30):
+        raw = ("glow", color, max_radius, steps, alpha_start)
+        sprite = self.resolved.get(raw)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+        key = ("glow", self._color(color), int(max_radius), steps, int(alpha_start))
+        return self._resolve(raw, key, self._bake_glow)
+
+    def disc(self, color, radius, alpha=255):
+        raw = ("disc", color, radius, alpha)
+        sprite = self.resolved.get(raw)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+        key = ("disc", self._color(color), max(1, int(radius)), _quantize(alpha, self.alpha_step))
+        return self._resolve(raw, key, self._bake_disc)
+
+    def _bake_glow(self, color, max_radius, steps, alpha_start):
+        size = max(1, max_radius * 2)
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        sprite.fill((*color, 0))
+        transparency = np.ones((size, size))
+        for i in range(steps, 0, -1):
+            radius = int(max_radius * i / steps)
+            alpha = int(alpha_start * (i / steps))
+            if radius < 1: continue
+            mask = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(mask, (255, 255, 255, 255), (max_radius, max_radius), radius)
+            covered = pygame.surfarray.array_alpha(mask) > 0
+            transparency[covered] *= 1 - alpha / 255
+        pixels = pygame.surfarray.pixels_alpha(sprite)
+        pixels[...] = np.round(255 * (1 - transparency)).astype(np.uint8)
+        del pixels
+        return sprite
+
+    def _bake_disc(self, color, radius, alpha):
+        sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius)
+        return sprite
+
+    def clear(self):
+        self.sprites.clear()
+        self.resolved.clear()
+        self.hits = self.misses = 0
+
+class LRUSpriteCache(_CacheStats):
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = self.sprites[key] = display_convert(build(), alpha=True)
+        if len(self.sprites) > self.capacity:
+            self.sprites.popitem(last=False)
+        return sprite
+
+    def warm(self, entries):
+        for key, build in entries:
+            self.get(key, build)
+
+    def clear(self):
+        self.sprites.clear()
+        self.hits = self.misses = 0
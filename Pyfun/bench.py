@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+import game
+from headless import autopilot
+
+W, H = 900, 600
+WEATHERS = (None, "rain", "fog")
+PARTICLE_COUNTS = (100, 1000, 4000)
+TRAFFIC_COUNTS = (8, 32, 128)
+METRICS = ("mean_ms", "min_ms", "p50_ms", "p90_ms", "p99_ms", "max_ms")
+
+def summarize(seconds):
+    ms = np.asarray(seconds) * 1000.0
+    p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+    return {"samples": len(ms), "mean_ms": float(ms.mean()), "min_ms": float(ms.min()),
+            "p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": float(ms.max())}
+
+def measure(fn, samples, warmup):
+    for _ in range(warmup): fn()
+    clock = time.perf_counter
+    times = []
+    for _ in range(samples):
+        start = clock()
+        fn()
+        times.append(clock() - start)
+    return summarize(times)
+
+class Ticker:
+    def __init__(self, dt=game.SIM_DT): self.t, self.dt = 0.0, dt
+    def __call__(self):
+        self.t += self.dt
+        return self.t
+
+def parallax_case(screen, theme, weather):
+    palette = next(level[6] for level in game.LEVELS if level[8] == theme)
+    tick = Ticker()
+    return lambda: game.draw_parallax_city(screen, tick(), palette, weather, theme)
+
+def road_case(screen, weather):
+    tick = Ticker()
+    return lambda: game.draw_road(screen, 120, W - 120, tick(), weather_effect=weather)
+
+def hud_case(screen, font, small):
+    tick = Ticker()
+    def run():
+        t = tick()
+        game.draw_hud(screen, font, small, t * 7, t * 260, 4000, 260 + 40 * np.sin(t), 50 + 50 * np.sin(t * 0.3), "Benchmark")
+    return run
+
+def vehicle_case(cached):
+    specs = [(kind, color) for kind in game.VEHICLE_SPECS for color in game.TRAFFIC_COLORS]
+    i = iter(range(1 << 62))
+    if cached:
+        game.warm_vehicle_cache()
+        return lambda: game.make_vehicle(*specs[next(i) % len(specs)])
+    builders = [game._vehicle_entry(kind, color)[1] for kind, color in specs]
+    return lambda: builders[next(i) % len(builders)]()
+
+def glow_case(screen):
+    colors = game.TRAFFIC_COLORS
+    i = iter(range(1 << 62))
+    def run():
+        n = next(i)
+        game.glow_circle(screen, (100 + n % 700, 100 + n % 400), colors[n % len(colors)], 18, steps=6, alpha_start=36)
+    return run
+
+def particle_system(count):
+    system = game.ParticleSystem(capacity=max(4096, count), atlas=game.sprite_atlas, seed=1)
+    colors = list(game.PARTICLE_COLORS)
+    while len(system) < count:
+        system.spray((W / 2, H / 2), min(64, count - len(system)), (-40, 40), (-40, 40), 1e9, (2, 5), colors[len(system) % len(colors)])
+    return system
+
+def particle_update_case(count):
+    system = particle_system(count)
+    return lambda: system.update(game.SIM_DT)
+
+def particle_draw_case(screen, count):
+    system = particle_system(count)
+    return lambda: system.draw(screen)
+
+def traffic_case(count):
+    rng = game.random.Random(1)
+    player = pygame.Rect(W // 2 - 28, int(H * 0.72), 56, 100)
+    traffic = game.TrafficSystem((120, W - 120), rng)
+    for _ in range(count): traffic.spawn(rng.uniform(140, W - 140), rng.uniform(-140, H), 0.8)
+    def run():
+        traffic.update(game.SIM_DT, 300.0, player)
+        traffic.cull(H + 160)
+        while len(traffic) < count: traffic.spawn(rng.uniform(140, W - 140), -140, 0.8)
+    return run
+
+def timeline_case(level_index):
+    world = game.World(W, H, "Standard", level_index=level_index, seed=1)
+    return world.timeline.extend
+
+def frame_case(screen, font, small, level_index, scale=1.0):
+    world = game.World(W, H, "Standard", level_index=level_index, seed=1)
+    renderer = game.WorldRenderer(font, small)
+    view = game.Viewport(scale)
+    steps = max(1, round(game.SIM_HZ / game.RENDER_FPS))
+    goal = world.params["goal"]
+    for _ in range(240): world.step(game.SIM_DT, autopilot(world))
+    def run():
+        for _ in range(steps):
+            world.step(game.SIM_DT, autopilot(world))
+            if world.crashed: world.restart_level()
+            world.distance = min(world.distance, goal * 0.5)
+        canvas = view.target(screen)
+        renderer.draw(canvas, world)
+        view.present(screen, canvas)
+        pygame.display.flip()
+    return run
+
+def build_cases(screen, font, small):
+    cases = []
+    themes = list(dict.fromkeys(level[8] for level in game.LEVELS))
+    for theme in themes:
+        for weather in WEATHERS:
+            cases.append((f"parallax/{theme}/{weather or 'clear'}", lambda theme=theme, weather=weather: parallax_case(screen, theme, weather)))
+    for weather in WEATHERS:
+        cases.append((f"road/{weather or 'clear'}", lambda weather=weather: road_case(screen, weather)))
+    cases.append(("hud", lambda: hud_case(screen, font, small)))
+    cases.append(("vehicle/cached", lambda: vehicle_case(True)))
+    cases.append(("vehicle/build", lambda: vehicle_case(False)))
+    cases.append(("glow_circle", lambda: glow_case(screen)))
+    for n in PARTICLE_COUNTS:
+        cases.append((f"particles/{n}/update", lambda n=n: particle_update_case(n)))
+        cases.append((f"particles/{n}/draw", lambda n=n: particle_draw_case(screen, n)))
+    for n in TRAFFIC_COUNTS:
+        cases.append((f"traffic/{n}/update", lambda n=n: traffic_case(n)))
+    cases.append(("spawns/chunk", lambda: timeline_case(len(game.LEVELS) - 1)))
+    for i, level in enumerate(game.LEVELS):
+        cases.append((f"frame/{i:02d}-{level[0].lower().replace(' ', '-')}", lambda i=i: frame_case(screen, font, small, i)))
+    for scale in game.RENDER_SCALES[:-1]:
+        cases.append((f"frame-scaled/{round(scale * 100)}", lambda scale=scale: frame_case(screen, font, small, 0, scale)))
+    return cases
+
+def compare(results, baseline, metric, threshold, min_delta_ms=0.0):
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get(metric): continue
+        ratio = stats[metric] / base[metric]
+        stats["baseline_" + metric] = base[metric]
+        stats["ratio"] = ratio
+        if ratio > 1.0 + threshold and stats[metric] - base[metric] > min_delta_ms: regressions.append((name, ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Midnight Drag rendering and simulation paths without a window.")
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this text")
+    parser.add_argument("--samples", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--out", default=None, help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="compare against a previous --out file")
+    parser.add_argument("--metric", default="p50_ms", choices=METRICS)
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a case counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((W, H))
+    game.warm_sprite_atlas()
+    font = game.get_font("Montserrat", 28)
+    small = game.get_font("Montserrat", 18)
+
+    results = {}
+    for name, factory in build_cases(screen, font, small):
+        if args.filter and args.filter not in name: continue
+        results[name] = measure(factory(), args.samples, args.warmup)
+        r = results[name]
+        print(f"{name:<34} p50={r['p50_ms']:7.3f} ms  p90={r['p90_ms']:7.3f} ms  p99={r['p99_ms']:7.3f} ms  mean={r['mean_ms']:7.3f} ms")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.metric, args.threshold, args.min_delta)
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {args.metric} {ratio:.2f}x baseline")
+        if not regressions: print(f"No regressions over {args.threshold:.0%} on {args.metric}.")
+
+    if args.out:
+        meta = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                "pygame": pygame.version.ver, "numpy": np.__version__, "platform": platform.platform(),
+                "samples": args.samples, "sim_hz": game.SIM_HZ, "render_fps": game.RENDER_FPS}
+        with open(args.out, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    pygame.quit()
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+class FakeDatabase:
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.root = {}
+        self.round_trips = 0
+        self.listeners = []
+
+    def roundtrip(self):
+        if self.latency: time.sleep(self.latency)
+        with self.lock:
+            self.round_trips += 1
+            if self.rng.random() < self.failure_rate:
+                raise ConnectionError("injected transport failure")
+
+    def reference(self, path=""):
+        return FakeReference(self, path)
+
+    def notify(self, event_type, path, data):
+        for listener in list(self.listeners):
+            root = listener.path
+            if path == root or path.startswith(root + "/") or not root:
+                rel = "/" + path[len(root):].strip("/")
+                listener.callback(SimpleNamespace(event_type=event_type, path=rel, data=data))
+
+class FakeListener:
+    def __init__(self, db, path, callback):
+        self.db = db
+        self.path = path
+        self.callback = callback
+
+    def close(self):
+        with self.db.lock:
+            if self in self.db.listeners: self.db.listeners.remove(self)
+
+class FakeReference:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path.strip("/")
+        self.key = self.path.rsplit("/", 1)[-1] or None
+
+    def _parts(self):
+        return [p for p in self.path.split("/") if p]
+
+    def _node(self, create=False):
+        node = self.db.root
+        for part in self._parts():
+            if part not in node:
+                if not create: return None
+                node[part] = {}
+            node = node[part]
+        return node
+
+    def update(self, value):
+        self.db.roundtrip()
+        with self.db.lock:
+            node = self._node(create=True)
+            node.update(value)
+        self.db.notify("patch", self.path, dict(value))
+
+    def get(self):
+        self.db.roundtrip()
+        with self.db.lock:
+            node = self._node()
+            return dict(node) if isinstance(node, dict) else node
+
+    def listen(self, callback):
+        listener = FakeListener(self.db, self.path, callback)
+        data = self.get()
+        with self.db.lock:
+            self.db.listeners.append(listener)
+        callback(SimpleNamespace(event_type="put", path="/", data=data))
+        return listener
+
+    def order_by_child(self, key):
+        return FakeQuery(self, key)
+
+class FakeQuery:
+    def __init__(self, ref, key):
+        self.ref = ref
+        self.key = key
+        self.limit = None
+
+    def limit_to_last(self, limit):
+        self.limit = limit
+        return self
+
+    def get(self):
+        data = self.ref.get() or {}
+        items = sorted(data.items(), key=lambda kv: kv[1].get(self.key, 0))
+        if self.limit is not None: items = items[-self.limit:]
+        return dict(items)
@@ -0,0 +1,19 @@
+import pygame
+
+from atlas import LRUSpriteCache
+
+_fonts = {}
+
+def get_font(name, size, bold=False, italic=False):
+    key = (name, size, bold, italic)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(name, size, bold=bold, italic=italic)
+    return font
+
+class TextCache(LRUSpriteCache):
+    def __init__(self, capacity=256):
+        super().__init__(capacity)
+
+    def render(self, font, text, color, antialias=True):
+        return self.get((font, text, color, antialias), lambda: font.render(text, antialias, color))
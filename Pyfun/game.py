@@ -1,33 +1,40 @@
+import startup
 import math
+import os
 import random
 import sys
+import numpy as np
 import pygame
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import db
-
-try:
-    cred = credentials.Certificate('MD.json')
-    firebase_admin.initialize_app(cred, {
-        'databaseURL': 'https://midnight-drag-default-rtdb.asia-southeast1.firebasedatabase.app/'
-    })
-    firebase_ref = db.reference('leaderboard')
-    print("Firebase initialized successfully.")
-except Exception as e:
-    print(f"Error initializing Firebase: {e}")
-    firebase_ref = None
-
-def clamp(x, a, b): return max(a, min(b, x))
-def lerp(a, b, t): return a + (b - a) * t
+startup.mark("import pygame")
+import textures
+import weather
+from atlas import LRUSpriteCache, SpriteAtlas
+from mathutil import clamp, lerp
+from particles import ParticleSystem
+from fonts import TextCache, get_font
+from textures import display_convert
+from spatial import SpatialHash
+from spawns import SpawnTimeline
+from pool import Pool
+from replay import Replay, load_best, save_run
+from screens import IdleScreen, wake
+from leaderboard import FirebaseConnection, FirebaseTransport, LeaderboardCache, LeaderboardService
+from fakedb import FakeDatabase
+from scorelog import ScoreLog
+from profiler import FrameProfiler
+from quality import QualityGovernor
+from viewport import SCALES as RENDER_SCALES, Viewport, parse_scale, px, scaled_sprite
+startup.mark("import game modules")
+
+sprite_atlas = SpriteAtlas()
+text_cache = TextCache(capacity=256)
 
 def glow_circle(surface, center, base_color, max_radius, steps=6, alpha_start=30):
-    r, g, b = base_color
-    for i in range(steps, 0, -1):
-        radius = int(max_radius * i / steps)
-        alpha = int(alpha_start * (i / steps))
-        s = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-        pygame.draw.circle(s, (r, g, b, alpha), (radius, radius), radius)
-        surface.blit(s, (center[0] - radius, center[1] - radius))
+    sprite = sprite_atlas.glow(base_color, max_radius, steps, alpha_start)
+    surface.blit(sprite, (center[0] - int(max_radius), center[1] - int(max_radius)))
+
+def game_fonts(scale=1.0):
+    return get_font("Montserrat", round(28 * scale)), get_font("Montserrat", round(18 * scale))
 
 def draw_neon_rect(surface, rect, color, thickness=2, glow=10):
     x, y, w, h = rect
@@ -38,12 +45,8 @@ def draw_neon_rect(surface, rect, color, thickness=2, glow=10):
 
 def draw_gradient_v(surface, rect, top_color, bottom_color):
     x, y, w, h = rect
-    for i in range(h):
-        t = i / max(1, h - 1)
-        c = (int(lerp(top_color[0], bottom_color[0], t)),
-             int(lerp(top_color[1], bottom_color[1], t)),
-             int(lerp(top_color[2], bottom_color[2], t)))
-        pygame.draw.line(surface, c, (x, y + i), (x + w, y + i))
+    if w <= 0 or h <= 0: return
+    surface.blit(textures.vertical_gradient((w, h), top_color, bottom_color), (x, y))
 
 def make_car_surface(w=56, h=100, primary=(255, 60, 180), accents=(0, 255, 220), kind="car"):
     surf = pygame.Surface((w, h), pygame.SRCALPHA)
@@ -106,42 +109,50 @@ def make_car_surface(w=56, h=100, primary=(255, 60, 180), accents=(0, 255, 220),
             pygame.draw.rect(surf, (90, 90, 110), wheel, width=2, border_radius=3)
     return surf
 
+VEHICLE_SPECS = {
+    "bike":    (32, 72, (240, 240, 255)),
+    "truck":   (72, 130, (240, 240, 255)),
+    "van":     (60, 108, (240, 240, 255)),
+    "sport":   (50, 90, (0, 255, 255)),
+    "muscle":  (60, 110, (255, 255, 0)),
+    "classic": (58, 95, (200, 200, 200)),
+    "car":     (56, 100, (240, 240, 255)),
+}
+
+vehicle_cache = LRUSpriteCache(capacity=64)
+
+def _vehicle_entry(kind, color):
+    if kind not in VEHICLE_SPECS: kind = "car"
+    w, h, accents = VEHICLE_SPECS[kind]
+    color = tuple(color)
+    return (kind, (w, h), color, accents), lambda: make_car_surface(w, h, primary=color, accents=accents, kind=kind)
+
 def make_vehicle(kind="car", color=(90, 200, 255)):
-    if kind == "bike":
-        return make_car_surface(32, 72, primary=color, accents=(240, 240, 255), kind="bike")
-    if kind == "truck":
-        return make_car_surface(72, 130, primary=color, accents=(240, 240, 255), kind="truck")
-    if kind == "van":
-        return make_car_surface(60, 108, primary=color, accents=(240, 240, 255), kind="van")
-    if kind == "sport":
-        return make_car_surface(50, 90, primary=color, accents=(0, 255, 255), kind="sport")
-    if kind == "muscle":
-        return make_car_surface(60, 110, primary=color, accents=(255, 255, 0), kind="muscle")
-    if kind == "classic":
-        return make_car_surface(58, 95, primary=color, accents=(200, 200, 200), kind="classic")
-    return make_car_surface(56, 100, primary=color, accents=(240, 240, 255), kind="car")
-
-class Particle:
-    def __init__(self, pos, vel, life, size, color):
-        self.x, self.y = pos
-        self.vx, self.vy = vel
-        self.life = life
-        self.t = life
-        self.size = size
-        self.color = color
-    def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.t -= dt
-    def alive(self): return self.t > 0
-    def draw(self, surface):
-        if self.t <= 0: return
-        k = self.t / self.life
-        a = int(180 * (k ** 1.5))
-        r = max(1, int(self.size * (0.6 + 0.4 * k)))
-        s = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-        pygame.draw.circle(s, (*self.color, a), (r, r), r)
-        surface.blit(s, (self.x - r, self.y - r))
+    return vehicle_cache.get(*_vehicle_entry(kind, color))
+
+def crash_burst(particles, pos):
+    particles.burst(pos, 50, (0, math.tau), (120, 340), 0.6, (3, 6), (255, 60, 120))
+
+def orb_burst(particles, pos):
+    particles.burst(pos, 12, (math.pi/2 - 0.6, math.pi/2 + 0.6), (90, 220), 0.5, (3, 6), (0, 255, 220))
+
+def crunch_burst(particles, pos):
+    particles.spray(pos, 5, (-50, 50), (50, 100), 0.3, (2, 4), (100, 100, 100))
+
+def nitro_trail(particles, pos, nitro_active):
+    vspread = 50 if nitro_active else 30
+    col = (0, 255, 220) if nitro_active else (255, 60, 120)
+    particles.spray(pos, 2 if nitro_active else 1, (-20, 20), (80 + vspread, 130 + vspread), (0.25, 0.45), (5, 9), col)
+
+PARTICLE_COLORS = ((255, 60, 120), (0, 255, 220), (100, 100, 100))
+
+def warm_sprite_atlas():
+    for color, radius, alpha_start in (((0, 255, 220), 18, 36), ((255, 255, 0), 20, 40), ((0, 255, 0), 20, 40), ((255, 165, 0), 20, 40)):
+        sprite_atlas.glow(color, radius, 6, alpha_start)
+    for color in PARTICLE_COLORS:
+        for radius in range(1, 10):
+            for alpha in range(0, 181, sprite_atlas.alpha_step):
+                sprite_atlas.disc(color, radius, alpha)
 
 LEVELS = [
     ("Neon Warmup",       1200,  1.0,  260,  0.55, 30, ((10,10,25),(15,5,40)), 0.35, "city"),
@@ -166,13 +177,51 @@ CAR_TYPES = {
     "Classic":  {"kind": "classic", "color": (150, 150, 150), "max_speed_mult": 0.9, "accel_mult": 0.9, "turn_mult": 1.1},
 }
 
-class Player:
+INPUT_LEFT, INPUT_RIGHT, INPUT_ACCEL, INPUT_BRAKE, INPUT_NITRO, INPUT_RESTART = 1, 2, 4, 8, 16, 32
+SIM_HZ = 120
+SIM_DT = 1.0 / SIM_HZ
+RENDER_FPS = 60
+HOLD_FPS = 10
+WEATHER_FADE = 1.5
+ROAD_MARGIN = 2 / 15
+
+def inputs_from_keys(keys):
+    inputs = 0
+    if keys[pygame.K_a] or keys[pygame.K_LEFT]:      inputs |= INPUT_LEFT
+    if keys[pygame.K_d] or keys[pygame.K_RIGHT]:     inputs |= INPUT_RIGHT
+    if keys[pygame.K_w] or keys[pygame.K_UP]:        inputs |= INPUT_ACCEL
+    if keys[pygame.K_s] or keys[pygame.K_DOWN]:      inputs |= INPUT_BRAKE
+    if keys[pygame.K_SPACE] or keys[pygame.K_LSHIFT]: inputs |= INPUT_NITRO
+    return inputs
+
+class Body:
+    __slots__ = ("x", "y", "prev_x", "prev_y", "rect")
+
+    def __init__(self, *args, **kwargs):
+        self.rect = None
+        self.reset(*args, **kwargs)
+
+    def place(self, x, y):
+        self.x = self.prev_x = float(x)
+        self.y = self.prev_y = float(y)
+        self.sync()
+
+    def sync(self):
+        if self.rect is not None: self.rect.topleft = (round(self.x), round(self.y))
+
+    def remember(self): self.prev_x, self.prev_y = self.x, self.y
+
+    def draw_pos(self, alpha=1.0, scale=1.0):
+        return round(lerp(self.prev_x, self.x, alpha) * scale), round(lerp(self.prev_y, self.y, alpha) * scale)
+
+class Player(Body):
     def __init__(self, x, y, car_type_name="Standard"):
         self.car_type_name = car_type_name
         car_stats = CAR_TYPES[car_type_name]
         self.base_surface = make_vehicle(car_stats["kind"], car_stats["color"])
         self.surface = self.base_surface
         self.rect = self.surface.get_rect(center=(x, y))
+        self.place(*self.rect.topleft)
         self.speed = 140.0
         self.base_max_speed = 280.0 * car_stats["max_speed_mult"]
         self.max_speed = self.base_max_speed
@@ -186,28 +235,30 @@ class Player:
         self.invincible_timer = 0.0
         self.score_multiplier_timer = 0.0
 
-    def update(self, dt, keys, bounds_x, road_grip_factor=1.0):
+    def update(self, dt, inputs, bounds_x, road_grip_factor=1.0):
+        self.remember()
         if not self.alive: return
 
         self.invincible_timer = max(0, self.invincible_timer - dt)
         self.score_multiplier_timer = max(0, self.score_multiplier_timer - dt)
 
-        if keys[pygame.K_w] or keys[pygame.K_UP]:   self.speed += self.accel * dt
-        if keys[pygame.K_s] or keys[pygame.K_DOWN]: self.speed -= self.accel * 1.2 * dt
+        if inputs & INPUT_ACCEL: self.speed += self.accel * dt
+        if inputs & INPUT_BRAKE: self.speed -= self.accel * 1.2 * dt
         self.speed = clamp(self.speed, 60.0, self.max_speed * (1.35 if self.nitro_active else 1.0))
-        if (keys[pygame.K_SPACE] or keys[pygame.K_LSHIFT]) and self.nitro > 0:
+        if inputs & INPUT_NITRO and self.nitro > 0:
             self.nitro_active = True
             self.nitro -= 30 * dt
             if self.nitro <= 0: self.nitro, self.nitro_active = 0, False
         else:
             self.nitro_active = False
         
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            self.rect.x += self.turn_speed * dt * (1.15 if self.nitro_active else 1.0) * road_grip_factor
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            self.rect.x -= self.turn_speed * dt * (1.15 if self.nitro_active else 1.0) * road_grip_factor
+        if inputs & INPUT_RIGHT:
+            self.x += self.turn_speed * dt * (1.15 if self.nitro_active else 1.0) * road_grip_factor
+        if inputs & INPUT_LEFT:
+            self.x -= self.turn_speed * dt * (1.15 if self.nitro_active else 1.0) * road_grip_factor
 
-        self.rect.x = clamp(self.rect.x, bounds_x[0], bounds_x[1] - self.rect.w)
+        self.x = clamp(self.x, bounds_x[0], bounds_x[1] - self.rect.w)
+        self.sync()
         self.trail_timer += dt
 
     def add_nitro(self, v): self.nitro = clamp(self.nitro + v, 0, self.nitro_max)
@@ -219,127 +270,272 @@ class Player:
     def set_max_speed_from_level(self, level_max_speed):
         self.max_speed = level_max_speed * (self.base_max_speed / 280.0)
 
-    def draw(self, surface):
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        pos = self.draw_pos(alpha, scale)
+        sprite = scaled_sprite(self.surface, scale)
         if self.is_invincible():
             if int(pygame.time.get_ticks() / 100) % 2 == 0:
-                temp_surf = self.surface.copy()
+                temp_surf = sprite.copy()
                 temp_surf.fill((255, 255, 0, 128), special_flags=pygame.BLEND_RGBA_MULT)
-                surface.blit(temp_surf, self.rect.topleft)
+                surface.blit(temp_surf, pos)
             else:
-                surface.blit(self.surface, self.rect.topleft)
+                surface.blit(sprite, pos)
         else:
-            surface.blit(self.surface, self.rect.topleft)
-
-class Traffic:
-    def __init__(self, x, y, level_activity, road_bounds):
-        r = random.random()
-        if r < 0.12:   kind = "bike"
-        elif r < 0.40: kind = "car"
-        elif r < 0.75: kind = "van"
-        else:          kind = "truck"
-        color_choices = [(70, 200, 255), (255, 60, 120), (140, 255, 120), (255, 180, 80), (160, 120, 255)]
-        color = random.choice(color_choices)
-        self.kind = kind
-        self.surface = make_vehicle(kind, color)
-        self.rect = self.surface.get_rect(midtop=(x, y))
-
-        base = {"bike": (170, 260), "car": (120, 220), "van": (100, 180), "truck": (80, 140)}[kind]
-        self.speed = random.uniform(*base)
+            surface.blit(sprite, pos)
+
+TRAFFIC_COLORS = [(70, 200, 255), (255, 60, 120), (140, 255, 120), (255, 180, 80), (160, 120, 255)]
+RIVAL_COLOR = (255, 200, 0)
+
+def warm_vehicle_cache():
+    entries = [_vehicle_entry(stats["kind"], stats["color"]) for stats in CAR_TYPES.values()]
+    entries += [_vehicle_entry(kind, color) for kind in ("bike", "car", "van", "truck") for color in TRAFFIC_COLORS]
+    entries.append(_vehicle_entry("car", RIVAL_COLOR))
+    vehicle_cache.warm(entries)
+
+TRAFFIC_KINDS = ("bike", "car", "van", "truck")
+TRAFFIC_SPEEDS = {"bike": (170, 260), "car": (120, 220), "van": (100, 180), "truck": (80, 140)}
+TRAFFIC_INSETS = np.array([10, 8, 6, 2])
+TRAFFIC_STEER = np.array([1.0, 1.0, 1.0, 0.5])
+
+def roll_vehicle(rng, activity):
+    r = rng.random()
+    if r < 0.12:   kind = "bike"
+    elif r < 0.40: kind = "car"
+    elif r < 0.75: kind = "van"
+    else:          kind = "truck"
+    color = rng.choice(TRAFFIC_COLORS)
+    speed = rng.uniform(*TRAFFIC_SPEEDS[kind])
+    max_vx = 22 + 28 * activity
+    vx = rng.uniform(-max_vx, max_vx) * (0.3 if kind == "truck" else 1.0)
+    wander_timer = rng.uniform(0.6, 1.4) / max(0.35, activity)
+    change_timer = rng.uniform(1.2, 2.2) / max(0.35, activity)
+    return kind, color, speed, vx, wander_timer, change_timer
+
+class TrafficSystem:
+    FIELDS = ("x", "y", "prev_x", "prev_y", "w", "h", "speed", "vx", "wander_timer", "change_timer", "target_x", "activity",
+              "kind", "sprite", "rx", "ry")
+    INT_FIELDS = ("kind", "sprite", "rx", "ry")
+
+    def __init__(self, road_bounds, rng=random, capacity=64):
         self.road_left, self.road_right = road_bounds
-        max_vx = 22 + 28 * level_activity
-        self.vx = random.uniform(-max_vx, max_vx) * (0.3 if kind == "truck" else 1.0)
-        self.wander_timer = random.uniform(0.6, 1.4) / max(0.35, level_activity)
-        self.change_timer = random.uniform(1.2, 2.2) / max(0.35, level_activity)
-        self.target_x = x
-        self.activity = level_activity
+        self.rng = rng
+        self.count = 0
+        self.capacity = 0
+        self.sprites = []
+        self._sprite_index = {}
+        self._k = self._damping = None
+        self._grow(capacity)
+
+    def __len__(self): return self.count
+
+    def clear(self): self.count = 0
+
+    def _grow(self, capacity):
+        for name in self.FIELDS:
+            arr = np.zeros(capacity, dtype=np.int64 if name in self.INT_FIELDS else np.float64)
+            old = getattr(self, name, None)
+            if old is not None: arr[:self.count] = old[:self.count]
+            setattr(self, name, arr)
+        self.capacity = capacity
+
+    def _sprite(self, kind, color):
+        index = self._sprite_index.get((kind, color))
+        if index is None:
+            index = self._sprite_index[(kind, color)] = len(self.sprites)
+            self.sprites.append(make_vehicle(kind, color))
+        return index
+
+    def lane_clear(self, x, top=140, gap=45):
+        n = self.count
+        centerx = self.rx[:n] + self.w[:n] // 2
+        return not np.any((np.abs(centerx - x) < gap) & (self.ry[:n] < top))
+
+    def spawn(self, x, y, activity):
+        kind, color, speed, vx, wander_timer, change_timer = roll_vehicle(self.rng, activity)
+        if self.count == self.capacity: self._grow(self.capacity * 2)
+        i = self.count
+        self.count += 1
+        sprite = self._sprite(kind, color)
+        w, h = self.sprites[sprite].get_size()
+        left = float(x - w / 2)
+        self.x[i] = self.prev_x[i] = left
+        self.y[i] = self.prev_y[i] = float(y)
+        self.rx[i], self.ry[i] = round(left), round(y)
+        self.w[i], self.h[i] = w, h
+        self.kind[i] = TRAFFIC_KINDS.index(kind)
+        self.sprite[i] = sprite
+        self.speed[i], self.vx[i] = speed, vx
+        self.wander_timer[i], self.change_timer[i] = wander_timer, change_timer
+        self.target_x[i] = x
+        self.activity[i] = activity
 
     def update(self, dt, world_speed, player_rect):
-        self.rect.y += int((world_speed - self.speed) * dt)
-
-        self.wander_timer -= dt
-        if self.wander_timer <= 0:
-            self.vx += random.uniform(-10, 10) * self.activity
-            self.wander_timer = random.uniform(0.5, 1.2)
-
-        self.change_timer -= dt
-        if self.change_timer <= 0:
-            width = self.road_right - self.road_left
-            lane_w = width / 5
-            candidate = random.randint(0, 5)
-            self.target_x = self.road_left + candidate * lane_w + random.uniform(0.2, 0.8) * lane_w
-            self.change_timer = random.uniform(1.0, 2.0) / max(0.4, self.activity)
-
-        if self.rect.left < self.road_left + 10: self.vx = abs(self.vx) * 0.8 + 20 * self.activity
-        if self.rect.right > self.road_right - 10: self.vx = -abs(self.vx) * 0.8 - 20 * self.activity
-
-        if abs(self.rect.centery - player_rect.centery) < 130:
-            if self.rect.centerx < player_rect.centerx:
-                self.vx -= 18 * self.activity
-            else:
-                self.vx += 18 * self.activity
-
-        steer = clamp(self.target_x - self.rect.centerx, -40, 40)
-        self.vx += steer * 0.6 * dt * (1.0 if self.kind != "truck" else 0.5)
-
-        self.rect.x += int(self.vx * dt)
-        self.vx *= (0.96 if self.kind != "bike" else 0.93)
-
-        if self.rect.left < self.road_left: self.rect.left, self.vx = self.road_left, abs(self.vx)*0.7
-        if self.rect.right > self.road_right: self.rect.right, self.vx = self.road_right, -abs(self.vx)*0.7
-
-    def draw(self, surface):
-        surface.blit(self.surface, self.rect.topleft)
-
-class RivalAI(Traffic):
-    def __init__(self, x, y, level_activity, road_bounds):
-        super().__init__(x, y, level_activity, road_bounds)
-        self.surface = make_vehicle("car", (255, 200, 0))
-        self.speed = random.uniform(200, 300)
-        self.target_lane = random.randint(0, 4)
-        self.lane_change_timer = random.uniform(2.0, 5.0)
+        n = self.count
+        if n == 0: return
+        rng, road_left, road_right = self.rng, self.road_left, self.road_right
+        x, y, w, vx, activity = self.x[:n], self.y[:n], self.w[:n], self.vx[:n], self.activity[:n]
+        k = dt * 60
+        if k != self._k: self._k, self._damping = k, np.array([0.93 ** k, 0.96 ** k, 0.96 ** k, 0.96 ** k])
+        self.prev_x[:n] = x
+        self.prev_y[:n] = y
+        y += (world_speed - self.speed[:n]) * dt
+
+        wander, change = self.wander_timer[:n], self.change_timer[:n]
+        wander -= dt
+        change -= dt
+        fired = (wander <= 0) | (change <= 0)
+        if fired.any():
+            target_x = self.target_x
+            for i in np.flatnonzero(fired).tolist():
+                if wander[i] <= 0:
+                    vx[i] += rng.uniform(-10, 10) * activity[i]
+                    wander[i] = rng.uniform(0.5, 1.2)
+                if change[i] <= 0:
+                    lane_w = (road_right - road_left) / 5
+                    target_x[i] = road_left + rng.randint(0, 5) * lane_w + rng.uniform(0.2, 0.8) * lane_w
+                    change[i] = rng.uniform(1.0, 2.0) / max(0.4, activity[i])
+
+        edge = x < road_left + 10
+        if edge.any(): vx[edge] = np.abs(vx[edge]) * 0.8 + 20 * activity[edge]
+        edge = x + w > road_right - 10
+        if edge.any(): vx[edge] = -np.abs(vx[edge]) * 0.8 - 20 * activity[edge]
+
+        cx = x + w / 2
+        near = np.abs(y + self.h[:n] / 2 - player_rect.centery) < 130
+        vx += np.copysign(18 * activity * k * near, cx - player_rect.centerx)
+        steer = np.maximum(np.minimum(self.target_x[:n] - cx, 40), -40)
+        vx += steer * 0.6 * dt * TRAFFIC_STEER[self.kind[:n]]
+
+        x += vx * dt
+        vx *= self._damping[self.kind[:n]]
+
+        wall = x < road_left
+        if wall.any():
+            x[wall] = road_left
+            vx[wall] = np.abs(vx[wall]) * 0.7
+        wall = x + w > road_right
+        if wall.any():
+            x[wall] = road_right - w[wall]
+            vx[wall] = -np.abs(vx[wall]) * 0.7
+        self.rx[:n] = np.rint(x)
+        self.ry[:n] = np.rint(y)
+
+    def _keep(self, keep):
+        n = self.count
+        m = int(np.count_nonzero(keep))
+        if m == n: return
+        for name in self.FIELDS:
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        self.count = m
+
+    def cull(self, bottom):
+        self._keep(self.ry[:self.count] < bottom)
+
+    def remove(self, i):
+        keep = np.ones(self.count, dtype=bool)
+        keep[i] = False
+        self._keep(keep)
+
+    def rect(self, i):
+        return pygame.Rect(int(self.rx[i]), int(self.ry[i]), int(self.w[i]), int(self.h[i]))
+
+    def rects(self):
+        return [self.rect(i) for i in range(self.count)]
+
+    def first_hit(self, box):
+        n = self.count
+        if n == 0: return None
+        inset = TRAFFIC_INSETS[self.kind[:n]]
+        left, top = self.rx[:n] + inset // 2, self.ry[:n] + inset // 2
+        right, bottom = left + self.w[:n] - inset, top + self.h[:n] - inset
+        hit = (box.left < right) & (left < box.right) & (box.top < bottom) & (top < box.bottom)
+        return int(np.argmax(hit)) if hit.any() else None
+
+    def near_miss(self, rect, reach, depth=90):
+        n = self.count
+        dy = self.ry[:n] + self.h[:n] // 2 - rect.centery
+        dx = np.abs(self.rx[:n] + self.w[:n] // 2 - rect.centerx)
+        return bool(np.any((dy > 0) & (dy < depth) & (dx < reach)))
+
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        n = self.count
+        if n == 0: return
+        xs = np.rint((self.prev_x[:n] + (self.x[:n] - self.prev_x[:n]) * alpha) * scale).astype(np.int64)
+        ys = np.rint((self.prev_y[:n] + (self.y[:n] - self.prev_y[:n]) * alpha) * scale).astype(np.int64)
+        sprites = self.sprites if scale == 1.0 else [scaled_sprite(sprite, scale) for sprite in self.sprites]
+        surface.blits([(sprites[s], (x, y)) for s, x, y in zip(self.sprite[:n].tolist(), xs.tolist(), ys.tolist())], doreturn=False)
+
+class RivalAI(Body):
+    __slots__ = ("rng", "surface", "speed", "road_left", "road_right", "vx", "activity", "target_lane", "lane_change_timer")
+
+    def reset(self, x, y, level_activity, road_bounds, rng=random):
+        self.rng = rng
+        self.vx = roll_vehicle(rng, level_activity)[3]
+        self.surface = make_vehicle("car", RIVAL_COLOR)
+        self.rect = self.surface.get_rect()
+        self.place(x - self.rect.w / 2, y)
+        self.road_left, self.road_right = road_bounds
+        self.activity = level_activity
+        self.speed = rng.uniform(200, 300)
+        self.target_lane = rng.randint(0, 4)
+        self.lane_change_timer = rng.uniform(2.0, 5.0)
 
     def update(self, dt, world_speed, player_rect):
-        self.rect.y += int((world_speed - self.speed) * dt)
+        self.remember()
+        self.y += (world_speed - self.speed) * dt
+        k = dt * 60
+        w, h = self.rect.size
 
         self.lane_change_timer -= dt
         if self.lane_change_timer <= 0:
-            self.target_lane = random.randint(0, 4)
-            self.lane_change_timer = random.uniform(2.0, 5.0)
+            self.target_lane = self.rng.randint(0, 4)
+            self.lane_change_timer = self.rng.uniform(2.0, 5.0)
 
         lane_w = (self.road_right - self.road_left) / 5
         target_x_in_lane = self.road_left + self.target_lane * lane_w + lane_w / 2
         
-        steer_force = clamp(target_x_in_lane - self.rect.centerx, -50, 50)
-        self.vx += steer_force * 0.8 * dt + random.uniform(-5, 5) * dt
+        cx = self.x + w / 2
+        steer_force = clamp(target_x_in_lane - cx, -50, 50)
+        self.vx += steer_force * 0.8 * dt + self.rng.uniform(-5, 5) * dt
 
-        if abs(self.rect.centery - player_rect.centery) < 150:
-            if self.rect.centerx < player_rect.centerx:
-                self.vx -= 25 * self.activity
+        if abs(self.y + h / 2 - player_rect.centery) < 150:
+            if cx < player_rect.centerx:
+                self.vx -= 25 * self.activity * k
             else:
-                self.vx += 25 * self.activity
+                self.vx += 25 * self.activity * k
 
-        self.rect.x += int(self.vx * dt)
-        self.vx *= 0.95
+        self.x += self.vx * dt
+        self.vx *= 0.95 ** k
+
+        if self.x < self.road_left: self.x, self.vx = self.road_left, abs(self.vx)*0.7
+        if self.x + w > self.road_right: self.x, self.vx = self.road_right - w, -abs(self.vx)*0.7
+        self.sync()
 
-        if self.rect.left < self.road_left: self.rect.left, self.vx = self.road_left, abs(self.vx)*0.7
-        if self.rect.right > self.road_right: self.rect.right, self.vx = self.road_right, -abs(self.vx)*0.7
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        surface.blit(scaled_sprite(self.surface, scale), self.draw_pos(alpha, scale))
 
-    def draw(self, surface):
-        surface.blit(self.surface, self.rect.topleft)
+class Orb(Body):
+    __slots__ = ("r", "color")
 
-class Orb:
-    def __init__(self, x, y):
-        self.x, self.y = x, y
+    def reset(self, x, y):
+        self.place(x, y)
         self.r = 10
         self.color = (0, 255, 220)
-    def update(self, dt, world_speed): self.y += (world_speed - 0) * dt
-    def draw(self, surface):
-        glow_circle(surface, (int(self.x), int(self.y)), self.color, 18, steps=6, alpha_start=36)
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.r, width=2)
-
-class PowerUp:
-    def __init__(self, x, y, power_type):
-        self.x, self.y = x, y
+    def update(self, dt, world_speed):
+        self.remember()
+        self.y += (world_speed - 0) * dt
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        pos = self.draw_pos(alpha, scale)
+        steps = quality.tier["glow_steps"]
+        if steps: glow_circle(surface, pos, self.color, px(18, scale), steps=steps, alpha_start=36)
+        pygame.draw.circle(surface, self.color, pos, px(self.r, scale), width=px(2, scale))
+
+class PowerUp(Body):
+    __slots__ = ("power_type", "r", "color", "text")
+
+    def reset(self, x, y, power_type):
+        self.place(x, y)
         self.power_type = power_type
         self.r = 12
         self.color = (255, 255, 0) if power_type == "invincibility" else \
@@ -348,54 +544,73 @@ class PowerUp:
         self.text = "I" if power_type == "invincibility" else \
                     "S" if power_type == "speed_boost" else \
                     "$"
-        self.font = pygame.font.SysFont("Montserrat", 16, bold=True)
 
     def update(self, dt, world_speed):
+        self.remember()
         self.y += (world_speed - 0) * dt
 
-    def draw(self, surface):
-        glow_circle(surface, (int(self.x), int(self.y)), self.color, 20, steps=6, alpha_start=40)
-        pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.r, width=2)
-        text_surf = self.font.render(self.text, True, (255, 255, 255))
-        text_rect = text_surf.get_rect(center=(int(self.x), int(self.y)))
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        pos = self.draw_pos(alpha, scale)
+        steps = quality.tier["glow_steps"]
+        if steps: glow_circle(surface, pos, self.color, px(20, scale), steps=steps, alpha_start=40)
+        pygame.draw.circle(surface, self.color, pos, px(self.r, scale), width=px(2, scale))
+        text_surf = text_cache.render(get_font("Montserrat", px(16, scale), bold=True), self.text, (255, 255, 255))
+        text_rect = text_surf.get_rect(center=pos)
         surface.blit(text_surf, text_rect)
 
     def alive(self, screen_height):
         return self.y < screen_height + 60
 
-class Obstacle:
-    def __init__(self, x, y, width, height, color=(200, 50, 50)):
-        self.rect = pygame.Rect(x, y, width, height)
+class Obstacle(Body):
+    __slots__ = ("color", "glow_color", "glow_strength")
+
+    def reset(self, x, y, width, height, color=(200, 50, 50)):
+        if self.rect is None: self.rect = pygame.Rect(x, y, width, height)
+        else: self.rect.update(x, y, width, height)
+        self.place(x, y)
         self.color = color
         self.glow_color = (255, 0, 0)
         self.glow_strength = 10
 
     def update(self, dt, world_speed):
-        self.rect.y += int(world_speed * dt)
-
-    def draw(self, surface):
-        for i in range(self.glow_strength, 0, -2):
-            a = int(18 * (i / self.glow_strength))
-            pygame.draw.rect(surface, (*self.glow_color, a), self.rect.inflate(i*2, i*2), border_radius=5)
-        pygame.draw.rect(surface, self.color, self.rect, border_radius=5)
+        self.remember()
+        self.y += world_speed * dt
+        self.sync()
+
+    def draw(self, surface, alpha=1.0, scale=1.0):
+        rect = pygame.Rect(self.draw_pos(alpha, scale), (px(self.rect.w, scale), px(self.rect.h, scale)))
+        radius = px(5, scale)
+        if quality.tier["obstacle_glow"]:
+            for i in range(self.glow_strength, 0, -2):
+                a = int(18 * (i / self.glow_strength))
+                grow = px(i * 2, scale)
+                pygame.draw.rect(surface, (*self.glow_color, a), rect.inflate(grow, grow), border_radius=radius)
+        pygame.draw.rect(surface, self.color, rect, border_radius=radius)
 
     def alive(self, screen_height):
         return self.rect.top < screen_height
 
-class DestructibleElement:
-    def __init__(self, x, y, width, height, color=(100, 100, 100)):
-        self.rect = pygame.Rect(x, y, width, height)
+class DestructibleElement(Body):
+    __slots__ = ("color", "life", "destroyed")
+
+    def reset(self, x, y, width, height, color=(100, 100, 100)):
+        if self.rect is None: self.rect = pygame.Rect(x, y, width, height)
+        else: self.rect.update(x, y, width, height)
+        self.place(x, y)
         self.color = color
         self.life = 1
         self.destroyed = False
 
     def update(self, dt, world_speed):
+        self.remember()
         if not self.destroyed:
-            self.rect.y += int(world_speed * dt)
+            self.y += world_speed * dt
+            self.sync()
 
-    def draw(self, surface):
+    def draw(self, surface, alpha=1.0, scale=1.0):
         if not self.destroyed:
-            pygame.draw.rect(surface, self.color, self.rect, border_radius=3)
+            size = (px(self.rect.w, scale), px(self.rect.h, scale))
+            pygame.draw.rect(surface, self.color, (self.draw_pos(alpha, scale), size), border_radius=px(3, scale))
 
     def alive(self, screen_height):
         return self.rect.top < screen_height and not self.destroyed
@@ -404,7 +619,11 @@ class DestructibleElement:
         self.destroyed = True
 
 class FloatingText:
-    def __init__(self, x, y, text, color=(255,255,255)):
+    __slots__ = ("x", "y", "text", "color", "timer")
+
+    def __init__(self, *args, **kwargs): self.reset(*args, **kwargs)
+
+    def reset(self, x, y, text, color=(255,255,255)):
         self.x, self.y, self.text, self.color = x, y, text, color
         self.timer = 1.2
     def update(self, dt):
@@ -412,727 +631,1045 @@ class FloatingText:
         self.y -= 35 * dt
     def alive(self): return self.timer > 0
 
-def draw_hud(surface, font, small, score, dist, goal, speed, nitro, level_name, paused=False, player_invincible=False, score_multiplier_active=False):
-    w, h = surface.get_size()
-    bar_w, bar_h = 200, 12
-    x, y = 20, h - 24
-    pygame.draw.rect(surface, (30, 30, 50), (x, y, bar_w, bar_h), border_radius=8)
-    fill = int(bar_w * clamp(speed / 500, 0, 1))
-    pygame.draw.rect(surface, (120, 200, 255), (x, y, fill, bar_h), border_radius=8)
-    surface.blit(small.render("SPEED", True, (200, 220, 255)), (x, y - 18))
-    nx = x + bar_w + 20
-    pygame.draw.rect(surface, (30, 30, 50), (nx, y, bar_w, bar_h), border_radius=8)
-    nfill = int(bar_w * clamp(nitro / 100, 0, 1))
-    pygame.draw.rect(surface, (0, 255, 220), (nx, y, nfill, bar_h), border_radius=8)
-    surface.blit(small.render("NITRO", True, (200, 255, 245)), (nx, y - 18))
-    surface.blit(font.render(f"{level_name}", True, (240, 240, 255)), (20, 12))
-    surface.blit(small.render(f"Score: {int(score)}", True, (230, 230, 255)), (20, 48))
-    surface.blit(small.render(f"Distance: {int(dist)} / {goal} m", True, (210, 210, 240)), (20, 72))
-
-    if player_invincible:
-        inv_text = small.render("INVINCIBLE!", True, (255, 255, 0))
-        surface.blit(inv_text, (nx + bar_w + 20, y - 18))
-    if score_multiplier_active:
-        mult_text = small.render("x2 SCORE!", True, (255, 165, 0))
-        surface.blit(mult_text, (nx + bar_w + 20, y))
+class HudLayer:
+    def __init__(self):
+        self.canvas = None
+        self.slots = {}
 
-    if paused:
-        overlay = pygame.Surface((w, h), pygame.SRCALPHA)
-        overlay.fill((6, 8, 14, 160))
-        surface.blit(overlay, (0, 0))
-        ptext = font.render("PAUSED", True, (255, 255, 255))
-        surface.blit(ptext, (w//2 - ptext.get_width()//2, h//2 - 60))
-        for i, line in enumerate(["A/D or ←/→: steer", "W/S or ↑/↓: accelerate / brake", "SPACE: Nitro      R: Restart      ESC: Quit"]):
-            t = small.render(line, True, (220, 230, 255))
-            surface.blit(t, (w//2 - t.get_width()//2, h//2 + i*22))
+    def reset(self, size):
+        self.canvas = pygame.Surface(size, pygame.SRCALPHA)
+        self.slots.clear()
 
-def draw_parallax_city(surface, t, palette, weather_effect=None, background_theme="city"):
-    w, h = surface.get_size()
-    sky_top, sky_bottom = palette
-    draw_gradient_v(surface, (0, 0, w, h), sky_top, sky_bottom)
-    
-    random.seed(0)
-    for _ in range(60):
-        sx = random.randint(0, w)
-        sy = random.randint(0, h//2)
-        pygame.draw.rect(surface, (220, 230, 255), (sx, sy, 2, 2))
-    
-    random.seed(1)
-    base_y = int(h * 0.55)
-
-    if background_theme == "city":
-        for i in range(80):
-            bx = (i * 40 - int(t * 20)) % (w + 40) - 20
-            bw = random.randint(20, 46)
-            bh = random.randint(40, 130)
-            col = (20, 20, 40)
-            pygame.draw.rect(surface, col, (bx, base_y - bh, bw, bh))
-            if i % 3 == 0:
-                for wy in range(base_y - bh + 8, base_y - 10, 10):
-                    if random.random() < 0.3:
-                        wx = bx + random.randint(4, bw - 8)
-                        pygame.draw.rect(surface, (255, 230, 120), (wx, wy, 3, 5))
-    elif background_theme == "bridge":
-        for i in range(0, w, 100):
-            x_offset = (i - int(t * 10)) % (w + 100) - 50
-            pygame.draw.line(surface, (100, 100, 120), (x_offset, base_y), (x_offset + 50, base_y - 100), 3)
-            pygame.draw.line(surface, (100, 100, 120), (x_offset, base_y), (x_offset - 50, base_y - 100), 3)
-        draw_gradient_v(surface, (0, base_y, w, h - base_y), (10, 10, 40), (5, 5, 20))
-        for _ in range(50):
-            sx = random.randint(0, w)
-            sy = random.randint(base_y, h)
-            pygame.draw.rect(surface, (50, 50, 100, 100), (sx, sy, 2, 2))
-    elif background_theme == "futuristic":
-        for i in range(0, w, 80):
-            x_offset = (i - int(t * 30)) % (w + 80) - 40
-            pygame.draw.line(surface, (50, 200, 255, 150), (x_offset, base_y), (x_offset + 40, base_y - 150), 2)
-            pygame.draw.line(surface, (50, 200, 255, 150), (x_offset, base_y), (x_offset - 40, base_y - 150), 2)
-        for _ in range(30):
-            sx = random.randint(0, w)
-            sy = random.randint(0, base_y)
-            glow_circle(surface, (sx, sy), (100, 255, 255), 8, steps=4, alpha_start=20)
-    elif background_theme == "abyss":
-        for _ in range(100):
-            sx = random.randint(0, w)
-            sy = random.randint(0, h)
-            pygame.draw.circle(surface, (random.randint(0, 20), random.randint(0, 20), random.randint(30, 60)), (sx, sy), random.randint(1, 3))
-        for i in range(5):
-            cx = (i * 200 + int(t * 5)) % (w + 200) - 100
-            cy = (i * 150 + int(t * 8)) % (h + 150) - 75
-            glow_circle(surface, (cx, cy), (50, 50, 100), 15, steps=5, alpha_start=15)
-    elif background_theme == "desert":
-        for i in range(0, w, 150):
-            x_offset = (i - int(t * 15)) % (w + 150) - 75
-            pygame.draw.polygon(surface, (80, 60, 30), [(x_offset, base_y), (x_offset + 75, base_y - 80), (x_offset + 150, base_y)])
-        random.seed(2)
-        for _ in range(80):
-            sx = random.randint(0, w)
-            sy = random.randint(0, h//2)
-            pygame.draw.rect(surface, (255, 240, 200), (sx, sy, 1, 1))
-    elif background_theme == "mountain":
-        for i in range(0, w, 120):
-            x_offset = (i - int(t * 18)) % (w + 120) - 60
-            peak_height = random.randint(80, 150)
-            pygame.draw.polygon(surface, (40, 50, 60), [(x_offset, base_y), (x_offset + 60, base_y - peak_height), (x_offset + 120, base_y)])
-            pygame.draw.polygon(surface, (50, 60, 70), [(x_offset + 30, base_y), (x_offset + 90, base_y - peak_height + 20), (x_offset + 150, base_y)])
-    elif background_theme == "ocean":
-        ocean_horizon_y = int(h * 0.6)
-        draw_gradient_v(surface, (0, ocean_horizon_y, w, h - ocean_horizon_y), (10, 30, 70), (5, 15, 35))
-        for i in range(0, w, 50):
-            x_offset = (i - int(t * 10)) % (w + 50) - 25
-            pygame.draw.line(surface, (20, 50, 100, 100), (x_offset, ocean_horizon_y + random.randint(0, h - ocean_horizon_y)), (x_offset + 20, ocean_horizon_y + random.randint(0, h - ocean_horizon_y)), 1)
-        if random.random() < 0.05:
-            island_x = (random.randint(0, w) - int(t * 5)) % (w + 100) - 50
-            island_width = random.randint(50, 100)
-            island_height = random.randint(20, 40)
-            pygame.draw.ellipse(surface, (30, 60, 30), (island_x, ocean_horizon_y - island_height // 2, island_width, island_height))
-    elif background_theme == "volcano":
-        draw_gradient_v(surface, (0, 0, w, h), (50, 10, 10), (100, 30, 30))
-        for i in range(0, w, 100):
-            x_offset = (i - int(t * 15)) % (w + 100) - 50
-            peak_height = random.randint(60, 120)
-            pygame.draw.polygon(surface, (30, 0, 0), [(x_offset, base_y), (x_offset + 50, base_y - peak_height), (x_offset + 100, base_y)])
-            glow_circle(surface, (x_offset + 50, base_y - peak_height + 10), (255, 100, 0), 20, steps=4, alpha_start=15)
-    elif background_theme == "cosmic":
-        for _ in range(5):
-            nx = random.randint(0, w)
-            ny = random.randint(0, h)
-            glow_circle(surface, (nx, ny), (random.randint(50, 100), random.randint(0, 50), random.randint(100, 150)), random.randint(30, 80), steps=8, alpha_start=10)
-        for _ in range(10):
-            gx = random.randint(0, w)
-            gy = random.randint(0, h)
-            pygame.draw.circle(surface, (200, 200, 255), (gx, gy), random.randint(1, 2))
-            glow_circle(surface, (gx, gy), (200, 200, 255), 5, steps=3, alpha_start=5)
-
-    if weather_effect == "rain":
-        for _ in range(100):
-            x = random.randint(0, w)
-            y = random.randint(0, h)
-            pygame.draw.line(surface, (150, 150, 200, 180), (x, y), (x - 5, y + 10), 1)
-    elif weather_effect == "fog":
-        fog_overlay = pygame.Surface((w, h), pygame.SRCALPHA)
-        fog_overlay.fill((180, 180, 180, 80))
-        surface.blit(fog_overlay, (0, 0))
-
-def draw_road(surface, road_left, road_right, t, dash_speed=240, weather_effect=None):
-    w, h = surface.get_size()
-    road_w = road_right - road_left
-    draw_gradient_v(surface, (road_left, 0, road_w, h), (16, 16, 26), (26, 26, 36))
-    for side in (road_left, road_right - 4):
-        glow_color = (255, 0, 120)
-        for i in range(12, 0, -2):
-            a = int(14 * (i / 12))
-            pygame.draw.rect(surface, (*glow_color, a), (side - (i if side==road_left else 0), 0, 4+i, h))
-    lane_count = 5
-    lane_w = road_w / lane_count
-    dash_h = 32
-    gap = 36
-    off = int((t * dash_speed) % (dash_h + gap))
-    for k in range(1, lane_count):
-        x = int(road_left + k * lane_w)
-        for y in range(-off, h, dash_h + gap):
-            pygame.draw.rect(surface, (210, 210, 220), (x-2, y, 4, dash_h), border_radius=3)
-
-    if weather_effect == "rain":
-        for _ in range(5):
-            px = random.randint(road_left, road_right)
-            py = random.randint(0, h)
-            pygame.draw.circle(surface, (50, 50, 70, 100), (px, py), random.randint(10, 30))
-
-def submit_score(player_name, score):
-    if firebase_ref:
-        try:
-            firebase_ref.push().set({'name': player_name, 'score': score})
-            print(f"Score {score} submitted for {player_name}.")
-        except Exception as e:
-            print(f"Error submitting score to Firebase: {e}")
-    else:
-        print("Firebase not initialized. Cannot submit score.")
-
-def get_leaderboard():
-    if firebase_ref:
-        try:
-            scores_data = firebase_ref.order_by_child('score').limit_to_last(10).get()
-            leaderboard = []
-            if scores_data:
-                for key, value in scores_data.items():
-                    leaderboard.append((value.get('name', 'Unknown'), value.get('score', 0)))
-                leaderboard.sort(key=lambda x: x[1], reverse=True)
-            return leaderboard
-        except Exception as e:
-            print(f"Error retrieving leaderboard from Firebase: {e}")
-            return []
-    else:
-        print("Firebase not initialized. Cannot retrieve leaderboard.")
-        return []
+    def slot(self, name, key, draw):
+        slot = self.slots.get(name)
+        if slot is not None and slot[0] == key: return
+        if slot is not None: self.canvas.fill((0, 0, 0, 0), slot[1])
+        self.slots[name] = (key, draw(self.canvas))
 
-def leaderboard_screen(screen, font, small, W, H):
-    leaderboard_running = True
-    leaderboard_data = get_leaderboard()
+    def blit_to(self, surface):
+        surface.blits([(self.canvas, rect.topleft, rect) for _, rect in self.slots.values() if rect.w], doreturn=False)
 
-    while leaderboard_running:
-        screen.fill((10, 10, 30))
+hud_layer = HudLayer()
+NO_RECT = pygame.Rect(0, 0, 0, 0)
 
-        title_text = font.render("LEADERBOARD", True, (0, 255, 220))
-        screen.blit(title_text, (W // 2 - title_text.get_width() // 2, 50))
+def _hud_bar(surface, small, label, label_color, color, x, y, bar_w, bar_h, fill, scale=1.0):
+    radius = px(8, scale)
+    rect = pygame.draw.rect(surface, (30, 30, 50), (x, y, bar_w, bar_h), border_radius=radius)
+    pygame.draw.rect(surface, color, (x, y, fill, bar_h), border_radius=radius)
+    return rect.union(surface.blit(text_cache.render(small, label, label_color), (x, y - px(18, scale))))
 
-        if leaderboard_data:
-            y_offset = 150
-            for i, (name, score) in enumerate(leaderboard_data):
-                entry_text = small.render(f"{i+1}. {name}: {int(score)}", True, (255, 255, 255))
-                screen.blit(entry_text, (W // 2 - entry_text.get_width() // 2, y_offset + i * 30))
-        else:
-            no_data_text = small.render("No scores yet or Firebase error.", True, (150, 150, 150))
-            screen.blit(no_data_text, (W // 2 - no_data_text.get_width() // 2, H // 2))
+def dim(surface, color=(6, 8, 14), alpha=160):
+    veil = pygame.Surface(surface.get_size())
+    veil.fill(color)
+    veil.set_alpha(alpha)
+    surface.blit(veil, (0, 0))
 
-        back_text = small.render("Press ESC to return to Main Menu", True, (200, 200, 200))
-        screen.blit(back_text, (W // 2 - back_text.get_width() // 2, H - 50))
+def draw_hud(surface, font, small, score, dist, goal, speed, nitro, level_name, paused=False, player_invincible=False, score_multiplier_active=False, scale=1.0):
+    w, h = surface.get_size()
+    if hud_layer.canvas is None or hud_layer.canvas.get_size() != (w, h): hud_layer.reset((w, h))
+    bar_w, bar_h = px(200, scale), px(12, scale)
+    margin = px(20, scale)
+    x, y = margin, h - px(24, scale)
+    nx = x + bar_w + margin
+    score_y = max(px(48, scale), px(12, scale) + font.get_linesize())
+    dist_y = max(px(72, scale), score_y + small.get_linesize())
+    badge_y = y - max(px(18, scale), small.get_linesize())
+    fill = int(bar_w * clamp(speed / 500, 0, 1))
+    nfill = int(bar_w * clamp(nitro / 100, 0, 1))
+    hud_layer.slot("speed", (small, fill), lambda s: _hud_bar(s, small, "SPEED", (200, 220, 255), (120, 200, 255), x, y, bar_w, bar_h, fill, scale))
+    hud_layer.slot("nitro", (small, nfill), lambda s: _hud_bar(s, small, "NITRO", (200, 255, 245), (0, 255, 220), nx, y, bar_w, bar_h, nfill, scale))
+    hud_layer.slot("level", (font, level_name), lambda s: s.blit(text_cache.render(font, f"{level_name}", (240, 240, 255)), (margin, px(12, scale))))
+    hud_layer.slot("score", (small, int(score)), lambda s: s.blit(small.render(f"Score: {int(score)}", True, (230, 230, 255)), (margin, score_y)))
+    hud_layer.slot("distance", (small, int(dist), goal), lambda s: s.blit(small.render(f"Distance: {int(dist)} / {goal} m", True, (210, 210, 240)), (margin, dist_y)))
+    hud_layer.slot("invincible", (small, player_invincible),
+                   lambda s: s.blit(text_cache.render(small, "INVINCIBLE!", (255, 255, 0)), (nx + bar_w + margin, badge_y)) if player_invincible else NO_RECT)
+    hud_layer.slot("multiplier", (small, score_multiplier_active),
+                   lambda s: s.blit(text_cache.render(small, "x2 SCORE!", (255, 165, 0)), (nx + bar_w + margin, y)) if score_multiplier_active else NO_RECT)
+    hud_layer.blit_to(surface)
 
-        pygame.display.flip()
+    if paused:
+        dim(surface)
+        ptext = text_cache.render(font, "PAUSED", (255, 255, 255))
+        surface.blit(ptext, (w//2 - ptext.get_width()//2, h//2 - px(60, scale)))
+        for i, line in enumerate(["A/D or ←/→: steer", "W/S or ↑/↓: accelerate / brake", "SPACE: Nitro      R: Restart      ESC: Quit"]):
+            t = text_cache.render(small, line, (220, 230, 255))
+            surface.blit(t, (w//2 - t.get_width()//2, h//2 + i * px(22, scale)))
+
+def _draw_shape(surface, shape, dx):
+    kind, color, *args = shape
+    if kind == "rect":
+        x, y, w, h = args[0]
+        pygame.draw.rect(surface, color, (x + dx, y, w, h))
+    elif kind == "line":
+        (x1, y1), (x2, y2), width = args
+        pygame.draw.line(surface, color, (x1 + dx, y1), (x2 + dx, y2), width)
+    elif kind == "poly":
+        pygame.draw.polygon(surface, color, [(x + dx, y) for x, y in args[0]])
+    elif kind == "ellipse":
+        x, y, w, h = args[0]
+        pygame.draw.ellipse(surface, color, (x + dx, y, w, h))
+    elif kind == "glow":
+        (x, y), radius, steps, alpha_start = args
+        glow_circle(surface, (x + dx, y), color, radius, steps=steps, alpha_start=alpha_start)
+
+class ParallaxLayers:
+    def __init__(self, size, palette, background_theme, scale=1.0):
+        w, h = round(size[0] / scale), round(size[1] / scale)
+        self.size, self.theme, self.scale = (w, h), background_theme, scale
+        self.strips = []
+        self.base = pygame.Surface((w, h))
+        base = self.base
+        draw_gradient_v(base, (0, 0, w, h), *palette)
+
+        base.blit(textures.starfield((w, h), 60, (220, 230, 255), seed=0, star_size=2, max_y=h//2), (0, 0))
+
+        rng = random.Random(1)
+        base_y = int(h * 0.55)
+
+        if background_theme == "city":
+            period, shapes = w + 40, []
+            for i in range(80):
+                bx = (i * 40) % period
+                bw = rng.randint(20, 46)
+                bh = rng.randint(40, 130)
+                shapes.append(("rect", (20, 20, 40), (bx, base_y - bh, bw, bh)))
+                if i % 3 == 0:
+                    for wy in range(base_y - bh + 8, base_y - 10, 10):
+                        if rng.random() < 0.3:
+                            wx = bx + rng.randint(4, bw - 8)
+                            shapes.append(("rect", (255, 230, 120), (wx, wy, 3, 5)))
+            self.add_strip(shapes, period, 20, -20)
+        elif background_theme == "bridge":
+            shapes = []
+            for i in range(0, w, 100):
+                shapes.append(("line", (100, 100, 120), (i, base_y), (i + 50, base_y - 100), 3))
+                shapes.append(("line", (100, 100, 120), (i, base_y), (i - 50, base_y - 100), 3))
+            self.add_strip(shapes, w + 100, 10, -50)
+            draw_gradient_v(base, (0, base_y, w, h - base_y), (10, 10, 40), (5, 5, 20))
+            for _ in range(50):
+                sx = rng.randint(0, w)
+                sy = rng.randint(base_y, h)
+                pygame.draw.rect(base, (50, 50, 100), (sx, sy, 2, 2))
+        elif background_theme == "futuristic":
+            shapes = []
+            for i in range(0, w, 80):
+                shapes.append(("line", (50, 200, 255), (i, base_y), (i + 40, base_y - 150), 2))
+                shapes.append(("line", (50, 200, 255), (i, base_y), (i - 40, base_y - 150), 2))
+            self.add_strip(shapes, w + 80, 30, -40)
+            for _ in range(30):
+                sx = rng.randint(0, w)
+                sy = rng.randint(0, base_y)
+                glow_circle(base, (sx, sy), (100, 255, 255), 8, steps=4, alpha_start=20)
+        elif background_theme == "abyss":
+            for _ in range(100):
+                sx = rng.randint(0, w)
+                sy = rng.randint(0, h)
+                color = (rng.randint(0, 20), rng.randint(0, 20), rng.randint(30, 60))
+                pygame.draw.circle(base, color, (sx, sy), rng.randint(1, 3))
+        elif background_theme == "desert":
+            shapes = [("poly", (80, 60, 30), [(i, base_y), (i + 75, base_y - 80), (i + 150, base_y)]) for i in range(0, w, 150)]
+            self.add_strip(shapes, w + 150, 15, -75)
+            base.blit(textures.starfield((w, h), 80, (255, 240, 200), seed=2, star_size=1, max_y=h//2), (0, 0))
+        elif background_theme == "mountain":
+            shapes = []
+            for i in range(0, w, 120):
+                peak_height = rng.randint(80, 150)
+                shapes.append(("poly", (40, 50, 60), [(i, base_y), (i + 60, base_y - peak_height), (i + 120, base_y)]))
+                shapes.append(("poly", (50, 60, 70), [(i + 30, base_y), (i + 90, base_y - peak_height + 20), (i + 150, base_y)]))
+            self.add_strip(shapes, w + 120, 18, -60)
+        elif background_theme == "ocean":
+            ocean_horizon_y = int(h * 0.6)
+            base.blit(textures.water_bands((w, h - ocean_horizon_y), (10, 30, 70), (5, 15, 35), (20, 50, 100)), (0, ocean_horizon_y))
+            shapes = []
+            for i in range(0, w, 50):
+                y1 = ocean_horizon_y + rng.randint(0, h - ocean_horizon_y)
+                y2 = ocean_horizon_y + rng.randint(0, h - ocean_horizon_y)
+                shapes.append(("line", (20, 50, 100), (i, y1), (i + 20, y2), 1))
+            self.add_strip(shapes, w + 50, 10, -25)
+            if rng.random() < 0.05:
+                island_x = rng.randint(0, w) % (w + 100)
+                island_width = rng.randint(50, 100)
+                island_height = rng.randint(20, 40)
+                island = ("ellipse", (30, 60, 30), (island_x, ocean_horizon_y - island_height // 2, island_width, island_height))
+                self.add_strip([island], w + 100, 5, -50)
+        elif background_theme == "volcano":
+            draw_gradient_v(base, (0, 0, w, h), (50, 10, 10), (100, 30, 30))
+            shapes = []
+            for i in range(0, w, 100):
+                peak_height = rng.randint(60, 120)
+                shapes.append(("poly", (30, 0, 0), [(i, base_y), (i + 50, base_y - peak_height), (i + 100, base_y)]))
+                shapes.append(("glow", (255, 100, 0), (i + 50, base_y - peak_height + 10), 20, 4, 15))
+            self.add_strip(shapes, w + 100, 15, -50, opaque=True)
+        elif background_theme == "cosmic":
+            for _ in range(5):
+                nx = rng.randint(0, w)
+                ny = rng.randint(0, h)
+                color = (rng.randint(50, 100), rng.randint(0, 50), rng.randint(100, 150))
+                glow_circle(base, (nx, ny), color, rng.randint(30, 80), steps=8, alpha_start=10)
+            for _ in range(10):
+                gx = rng.randint(0, w)
+                gy = rng.randint(0, h)
+                pygame.draw.circle(base, (200, 200, 255), (gx, gy), rng.randint(1, 2))
+                glow_circle(base, (gx, gy), (200, 200, 255), 5, steps=3, alpha_start=5)
+
+        self.base = display_convert(base)
+        if scale != 1.0: self.rescale(size)
+
+    def rescale(self, size):
+        k = self.scale
+        self.base = display_convert(pygame.transform.smoothscale(self.base, size))
+        self.strips = [(display_convert(pygame.transform.smoothscale(strip, (px(period, k), px(strip.get_height(), k))),
+                                         alpha=bool(strip.get_flags() & pygame.SRCALPHA)),
+                        round(y * k), px(period, k), speed * k, round(origin * k))
+                       for strip, y, period, speed, origin in self.strips]
+
+    def add_strip(self, shapes, period, speed, origin, opaque=False):
+        w, h = self.size
+        strip = pygame.Surface((period, h), pygame.SRCALPHA)
+        for dx in (-period, 0, period):
+            for shape in shapes: _draw_shape(strip, shape, dx)
+        rows = strip.get_bounding_rect()
+        if rows.h == 0: return
+        if opaque:
+            strip = pygame.Surface((period, h))
+            for x in range(0, period, w): strip.blit(self.base, (x, 0))
+            for dx in (-period, 0, period):
+                for shape in shapes: _draw_shape(strip, shape, dx)
+        strip = display_convert(strip.subsurface((0, rows.y, period, rows.h)).copy(), alpha=not opaque)
+        self.strips.append((strip, rows.y, period, speed, origin))
+
+    def draw(self, surface, t, detail=True):
+        w, h = self.size
+        k = self.scale
+        surface.blit(self.base, (0, 0))
+        if not detail: return
+        for strip, y, period, speed, origin in self.strips:
+            x = origin - int(t * speed) % period
+            surface.blit(strip, (x, y))
+            surface.blit(strip, (x + period, y))
+        if self.theme == "abyss":
+            for i in range(5):
+                cx = (i * 200 + int(t * 5)) % (w + 200) - 100
+                cy = (i * 150 + int(t * 8)) % (h + 150) - 75
+                glow_circle(surface, (round(cx * k), round(cy * k)), (50, 50, 100), px(15, k), steps=5, alpha_start=15)
+
+_parallax_cache = {}
+
+def get_parallax_layers(size, palette, background_theme, scale=1.0):
+    key = (size, palette, background_theme, scale)
+    layers = _parallax_cache.get(key)
+    if layers is None:
+        layers = _parallax_cache[key] = ParallaxLayers(size, palette, background_theme, scale)
+    return layers
+
+def draw_parallax_city(surface, t, palette, weather_effect=None, background_theme="city", weather_intensity=1.0, detail=True, rain_layers=3, scale=1.0):
+    get_parallax_layers(surface.get_size(), palette, background_theme, scale).draw(surface, t, detail)
+    if weather_effect == "rain": weather.draw_rain(surface, t, weather_intensity, layers=rain_layers, scale=scale)
+    elif weather_effect == "fog": weather.draw_fog(surface, weather_intensity)
+
+class RoadLayers:
+    edge_color = (255, 0, 120)
+    dash_color = (210, 210, 220)
+    dash_h, gap, edge = 32, 36, 12
+
+    def __init__(self, size, lane_count=5, scale=1.0):
+        road_w, h = size
+        self.dash_h, self.gap, self.edge = px(self.dash_h, scale), px(self.gap, scale), px(self.edge, scale)
+        edge, bar = self.edge, px(4, scale)
+        self.base = pygame.Surface((road_w + edge * 2, h))
+        draw_gradient_v(self.base, (edge, 0, road_w, h), (16, 16, 26), (26, 26, 36))
+        for i in range(edge, 0, -2):
+            pygame.draw.rect(self.base, self.edge_color, (edge - i, 0, bar + i, h))
+            pygame.draw.rect(self.base, self.edge_color, (edge + road_w - bar, 0, bar + i, h))
+        self.base = display_convert(self.base)
+
+        self.period = self.dash_h + self.gap
+        lane_w = road_w / lane_count
+        self.dashes = pygame.Surface((road_w, (h // self.period + 2) * self.period))
+        self.dashes.fill((255, 0, 255))
+        for k in range(1, lane_count):
+            x = int(k * lane_w)
+            for y in range(0, self.dashes.get_height(), self.period):
+                pygame.draw.rect(self.dashes, self.dash_color, (x - bar // 2, y, bar, self.dash_h), border_radius=px(3, scale))
+        self.dashes = display_convert(self.dashes)
+        self.dashes.set_colorkey((255, 0, 255), pygame.RLEACCEL)
+
+    def draw(self, surface, road_left, scroll):
+        off = int(scroll % self.period)
+        surface.blits([(self.base, (road_left - self.edge, 0)), (self.dashes, (road_left, -off))], doreturn=False)
+
+_road_cache = {}
+
+def get_road_layers(size, lane_count=5, scale=1.0):
+    key = (size, lane_count, scale)
+    layers = _road_cache.get(key)
+    if layers is None:
+        layers = _road_cache[key] = RoadLayers(size, lane_count, scale)
+    return layers
+
+def draw_road(surface, road_left, road_right, t, dash_speed=240, weather_effect=None, weather_intensity=1.0, lane_count=5, scale=1.0):
+    road_left, road_right, scroll = round(road_left * scale), round(road_right * scale), t * dash_speed * scale
+    get_road_layers((road_right - road_left, surface.get_height()), lane_count, scale).draw(surface, road_left, scroll)
+    if weather_effect == "rain": weather.draw_puddles(surface, road_left, road_right, scroll, weather_intensity, scale=scale)
+
+def make_leaderboard_service():
+    fake_latency = os.environ.get("MD_FAKE_LEADERBOARD")
+    if fake_latency is not None:
+        fake_db = FakeDatabase(latency=float(fake_latency or 0), failure_rate=float(os.environ.get("MD_FAKE_FAILURES", 0)))
+        transport, cache, log = FirebaseTransport(fake_db.reference("leaderboard")), LeaderboardCache(10, ttl=60.0), ScoreLog()
+    else:
+        connection = FirebaseConnection('MD.json', 'https://midnight-drag-default-rtdb.asia-southeast1.firebasedatabase.app/', 'leaderboard')
+        connection.start()
+        transport, cache, log = FirebaseTransport(connection), LeaderboardCache(10, ttl=60.0, path="leaderboard_cache.json"), ScoreLog("scores.wal")
+    cache.listeners.append(wake)
+    return LeaderboardService(transport, cache=cache, log=log)
+
+_leaderboard_service = None
+
+def get_leaderboard_service():
+    global _leaderboard_service
+    if _leaderboard_service is None: _leaderboard_service = make_leaderboard_service()
+    return _leaderboard_service
+
+def leaderboard_screen(screen, font, small, W, H, leaderboard_service):
+    leaderboard_service.top()
+    request = leaderboard_service.refreshing
+    if request: request.add_done_callback(wake)
+    connection = getattr(leaderboard_service.transport.ref, "future", None)
+    if connection: connection.add_done_callback(wake)
+    idle = IdleScreen(screen)
+
+    screen.fill((10, 10, 30))
+    title_text = font.render("LEADERBOARD", True, (0, 255, 220))
+    screen.blit(title_text, (W // 2 - title_text.get_width() // 2, 50))
+    back_text = small.render("Press ESC to return to Main Menu", True, (200, 200, 200))
+    screen.blit(back_text, (W // 2 - back_text.get_width() // 2, H - 50))
+
+    body = pygame.Rect(0, 95, W, H - 165)
+    shown = None
+    while True:
+        pending = request is not None and not request.done()
+        state = (leaderboard_service.cache.version, pending, leaderboard_service.status)
+        if state != shown:
+            shown = state
+            screen.fill((10, 10, 30), body)
+            board = leaderboard_service.cache.top()
+            error = request.exception() if request is not None and not pending else None
+            if pending:
+                connecting = leaderboard_service.status == "connecting"
+                status, color = ("Connecting to leaderboard..." if connecting else "Refreshing..."), (150, 150, 150)
+            elif error:
+                print(f"Error retrieving leaderboard: {error}")
+                status, color = f"Leaderboard unavailable: {error}", (255, 120, 140)
+            else:
+                status = None
+
+            if board:
+                y_offset = 150
+                for i, (name, score) in enumerate(board):
+                    entry_text = text_cache.render(small, f"{i+1}. {name}: {int(score)}", (255, 255, 255))
+                    screen.blit(entry_text, (W // 2 - entry_text.get_width() // 2, y_offset + i * 30))
+                if status:
+                    status_text = small.render(status + (" • showing saved scores" if error else ""), True, color)
+                    screen.blit(status_text, (W // 2 - status_text.get_width() // 2, 105))
+            else:
+                if not status: status, color = "No scores yet.", (150, 150, 150)
+                status_text = small.render(status, True, color)
+                screen.blit(status_text, (W // 2 - status_text.get_width() // 2, H // 2))
+            idle.invalidate(body)
 
-        for event in pygame.event.get():
+        for event in idle.wait():
             if event.type == pygame.QUIT:
                 return False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    leaderboard_running = False
-    return True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                return True
 
-def score_submission_prompt(screen, font, small, W, H, final_score):
-    input_active = True
+def score_submission_prompt(screen, font, small, W, H, final_score, leaderboard_service):
     player_name = ""
+    request = None
+    leave_at = None
+    idle = IdleScreen(screen)
+
+    screen.fill((10, 10, 30))
     prompt_text = font.render("Enter your name for the leaderboard:", True, (255, 255, 255))
     score_text = small.render(f"Your Score: {int(final_score)}", True, (0, 255, 220))
+    submit_info = small.render("Press ENTER to submit, ESC to skip", True, (200, 200, 200))
+    screen.blit(prompt_text, (W // 2 - prompt_text.get_width() // 2, H // 3))
+    screen.blit(score_text, (W // 2 - score_text.get_width() // 2, H // 3 + 50))
+    screen.blit(submit_info, (W // 2 - submit_info.get_width() // 2, H - 100))
+
+    box = pygame.Rect(W // 2, H // 2 + 50, 0, 0)
+    status = pygame.Rect(0, H // 2 + 85, W, 30)
+    drawn = shown = None
+    while True:
+        editing = request is None
+        pending = request is not None and not request.done()
+        finished = request is not None and request.done()
+
+        caret = editing and int(pygame.time.get_ticks() / 500) % 2 == 0
+        if (player_name, caret) != drawn:
+            drawn = (player_name, caret)
+            name_display = font.render(player_name + ("|" if caret else ""), True, (255, 255, 255))
+            name_rect = name_display.get_rect(center=(W // 2, H // 2 + 50))
+            screen.fill((10, 10, 30), box)
+            old_box, box = box, name_rect.inflate(20, 10)
+            pygame.draw.rect(screen, (50, 50, 80), box, border_radius=5)
+            screen.blit(name_display, name_rect)
+            idle.invalidate(box.union(old_box))
+
+        if (request, pending) != shown:
+            shown = (request, pending)
+            screen.fill((10, 10, 30), status)
+            if pending:
+                status_text = small.render("Uploading...", True, (200, 200, 200))
+            elif finished and request.exception():
+                status_text = small.render("Score saved • it will upload when the connection is back", True, (255, 180, 80))
+            elif finished:
+                status_text = small.render(f"Score {int(final_score)} submitted for {player_name}.", True, (0, 255, 220))
+            if request is not None:
+                screen.blit(status_text, status_text.get_rect(center=status.center))
+            idle.invalidate(status)
+
+        if finished:
+            leave_at = leave_at or pygame.time.get_ticks() + (1200 if not request.exception() else 2400)
+            timeout = leave_at - pygame.time.get_ticks()
+            if timeout <= 0: return True
+        else:
+            timeout = 500 - pygame.time.get_ticks() % 500 if editing else None
 
-    while input_active:
-        screen.fill((10, 10, 30))
-        screen.blit(prompt_text, (W // 2 - prompt_text.get_width() // 2, H // 3))
-        screen.blit(score_text, (W // 2 - score_text.get_width() // 2, H // 3 + 50))
-
-        name_display = font.render(player_name + ("|" if int(pygame.time.get_ticks() / 500) % 2 == 0 else ""), True, (255, 255, 255))
-        name_rect = name_display.get_rect(center=(W // 2, H // 2 + 50))
-        pygame.draw.rect(screen, (50, 50, 80), name_rect.inflate(20, 10), border_radius=5)
-        screen.blit(name_display, name_rect)
-
-        submit_info = small.render("Press ENTER to submit, ESC to skip", True, (200, 200, 200))
-        screen.blit(submit_info, (W // 2 - submit_info.get_width() // 2, H - 100))
-
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+        for event in idle.wait(timeout):
             if event.type == pygame.QUIT:
                 return False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    if player_name:
-                        submit_score(player_name, int(final_score))
-                    input_active = False
-                elif event.key == pygame.K_ESCAPE:
-                    input_active = False
-                elif event.key == pygame.K_BACKSPACE:
-                    player_name = player_name[:-1]
-                else:
-                    if len(player_name) < 15:
-                        player_name += event.unicode
-    return True
-
-def main_menu(screen, font, small, W, H):
-    menu_running = True
-    selected_option = 0
-    car_selection_mode = False
-    selected_car_index = 0
-    car_types_list = list(CAR_TYPES.keys())
-
-    while menu_running:
-        screen.fill((10, 10, 30))
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == pygame.K_ESCAPE or not editing:
+                return True
+            if event.key == pygame.K_RETURN:
+                if not player_name: return True
+                request = leaderboard_service.submit(player_name, int(final_score))
+                request.add_done_callback(wake)
+                break
+            elif event.key == pygame.K_BACKSPACE:
+                player_name = player_name[:-1]
+            else:
+                if len(player_name) < 15:
+                    player_name += event.unicode
 
-        title_text = font.render("MIDNIGHT DRAG", True, (0, 255, 220))
-        screen.blit(title_text, (W // 2 - title_text.get_width() // 2, H // 4))
+def car_select_panel(font, small, W, H, top, car_name):
+    panel = pygame.Surface((W, H - top))
+    panel.fill((10, 10, 30))
+    def put(surf, x, y): panel.blit(surf, (x, y - top))
 
-        if not car_selection_mode:
-            options = ["START GAME", "LEADERBOARD", "QUIT"]
-            for i, option in enumerate(options):
-                color = (255, 255, 255) if i == selected_option else (150, 150, 150)
-                text = font.render(option, True, color)
-                screen.blit(text, (W // 2 - text.get_width() // 2, H // 2 + i * 60))
-        else:
-            car_title = font.render("SELECT YOUR RIDE", True, (0, 200, 255))
-            screen.blit(car_title, (W // 2 - car_title.get_width() // 2, H // 2 - 100))
+    car_title = font.render("SELECT YOUR RIDE", True, (0, 200, 255))
+    put(car_title, W // 2 - car_title.get_width() // 2, H // 2 - 100)
 
-            selected_car_name = car_types_list[selected_car_index]
-            car_surface = make_vehicle(CAR_TYPES[selected_car_name]["kind"], CAR_TYPES[selected_car_name]["color"])
-            car_rect = car_surface.get_rect(center=(W // 2, H // 2 + 20))
-            screen.blit(car_surface, car_rect)
+    stats = CAR_TYPES[car_name]
+    car_surface = make_vehicle(stats["kind"], stats["color"])
+    put(car_surface, W // 2 - car_surface.get_width() // 2, H // 2 + 20 - car_surface.get_height() // 2)
 
-            car_name_text = small.render(selected_car_name, True, (255, 255, 255))
-            screen.blit(car_name_text, (W // 2 - car_name_text.get_width() // 2, H // 2 + 100))
+    car_name_text = small.render(car_name, True, (255, 255, 255))
+    put(car_name_text, W // 2 - car_name_text.get_width() // 2, H // 2 + 100)
 
-            stats = CAR_TYPES[selected_car_name]
-            stats_text = small.render(f"Speed: {stats['max_speed_mult']:.1f}x Accel: {stats['accel_mult']:.1f}x Turn: {stats['turn_mult']:.1f}x", True, (200, 200, 200))
-            screen.blit(stats_text, (W // 2 - stats_text.get_width() // 2, H // 2 + 130))
+    stats_text = small.render(f"Speed: {stats['max_speed_mult']:.1f}x Accel: {stats['accel_mult']:.1f}x Turn: {stats['turn_mult']:.1f}x", True, (200, 200, 200))
+    put(stats_text, W // 2 - stats_text.get_width() // 2, H // 2 + 130)
 
-            arrow_left = font.render("<", True, (255, 255, 255))
-            arrow_right = font.render(">", True, (255, 255, 255))
-            screen.blit(arrow_left, (W // 2 - 100, H // 2 + 10))
-            screen.blit(arrow_right, (W // 2 + 80, H // 2 + 10))
+    put(font.render("<", True, (255, 255, 255)), W // 2 - 100, H // 2 + 10)
+    put(font.render(">", True, (255, 255, 255)), W // 2 + 80, H // 2 + 10)
 
-            confirm_text = font.render("CONFIRM", True, (0, 255, 0))
-            screen.blit(confirm_text, (W // 2 - confirm_text.get_width() // 2, H // 2 + 200))
+    confirm_text = font.render("CONFIRM", True, (0, 255, 0))
+    put(confirm_text, W // 2 - confirm_text.get_width() // 2, H // 2 + 200)
+    return panel
 
-        pygame.display.flip()
+def main_menu(screen, font, small, W, H, leaderboard=None):
+    selected_option = 0
+    car_selection_mode = False
+    selected_car_index = 0
+    car_types_list = list(CAR_TYPES.keys())
+    best_replay = load_best()
+    race_ghost = False
+    options = ["START GAME"] + (["RACE GHOST"] if best_replay else []) + ["LEADERBOARD", "QUALITY", "RESOLUTION", "QUIT"]
+    settings = {"QUALITY": lambda: quality.preset.upper(), "RESOLUTION": lambda: viewport.label}
+    idle = IdleScreen(screen)
+    title_text = font.render("MIDNIGHT DRAG", True, (0, 255, 220))
+    body = pygame.Rect(0, H // 2 - 110, W, H - (H // 2 - 110))
+    row_h = min(60, (H - body.top - 40) // len(options))
+    rows_top = min(H // 2, H - 50 - (len(options) - 1) * row_h)
+    car_panels = {}
+    redraw_all = redraw_body = True
 
-        for event in pygame.event.get():
+    while True:
+        if redraw_all:
+            screen.fill((10, 10, 30))
+            screen.blit(title_text, (W // 2 - title_text.get_width() // 2, H // 4))
+            idle.invalidate()
+        if redraw_all or redraw_body:
+            if not car_selection_mode:
+                screen.fill((10, 10, 30), body)
+                for i, option in enumerate(options):
+                    color = (255, 255, 255) if i == selected_option else (150, 150, 150)
+                    label = f"{option}: {settings[option]()}" if option in settings else option
+                    text = text_cache.render(font, label, color)
+                    screen.blit(text, (W // 2 - text.get_width() // 2, rows_top + i * row_h))
+            else:
+                selected_car_name = car_types_list[selected_car_index]
+                panel = car_panels.get(selected_car_name)
+                if panel is None:
+                    panel = car_panels[selected_car_name] = car_select_panel(font, small, W, H, body.top, selected_car_name)
+                screen.blit(panel, body)
+            idle.invalidate(body)
+            redraw_all = redraw_body = False
+        idle.present()
+        startup.first_frame(verbose=bool(os.environ.get("MD_STARTUP_REPORT")))
+
+        for event in idle.wait():
             if event.type == pygame.QUIT:
                 return None
             if event.type == pygame.KEYDOWN:
                 if not car_selection_mode:
                     if event.key == pygame.K_UP:
                         selected_option = (selected_option - 1) % len(options)
+                        redraw_body = True
                     elif event.key == pygame.K_DOWN:
                         selected_option = (selected_option + 1) % len(options)
+                        redraw_body = True
+                    elif options[selected_option] in settings and event.key in (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_RETURN):
+                        (quality if options[selected_option] == "QUALITY" else viewport).cycle(-1 if event.key == pygame.K_LEFT else 1)
+                        redraw_body = True
                     elif event.key == pygame.K_RETURN:
-                        if selected_option == 0:
+                        choice = options[selected_option]
+                        if choice in ("START GAME", "RACE GHOST"):
                             car_selection_mode = True
-                        elif selected_option == 1:
-                            if not leaderboard_screen(screen, font, small, W, H):
+                            race_ghost = choice == "RACE GHOST"
+                            redraw_body = True
+                        elif choice == "LEADERBOARD":
+                            if not leaderboard_screen(screen, font, small, W, H, leaderboard or get_leaderboard_service()):
                                 return None
+                            redraw_all = True
                         else:
                             return None
                 else:
                     if event.key == pygame.K_LEFT:
                         selected_car_index = (selected_car_index - 1) % len(car_types_list)
+                        redraw_body = True
                     elif event.key == pygame.K_RIGHT:
                         selected_car_index = (selected_car_index + 1) % len(car_types_list)
+                        redraw_body = True
                     elif event.key == pygame.K_RETURN:
-                        return car_types_list[selected_car_index]
-
-    return None
-
-def game_loop(screen, font, small, W, H, selected_car_type):
-    clock = pygame.time.Clock()
-
-    road_margin = 120
-    road_left = road_margin
-    road_right = W - road_margin
-
-    player = Player(W // 2, int(H * 0.72), selected_car_type)
-
-    level_index = 0
-    def level_params(i):
-        name, goal, traffic_rate, max_spd, orb_rate, nm_score, palette, activity, background_theme = LEVELS[i]
-        return {"name": name, "goal": goal, "traffic_rate": traffic_rate, "max_spd": max_spd,
-                "orb_rate": orb_rate, "nm_score": nm_score, "palette": palette, "activity": activity, "background_theme": background_theme}
-    params = level_params(level_index)
-    player.set_max_speed_from_level(params["max_spd"])
-
-    score = 0
-    distance = 0
-    particles, traffics, orbs, obstacles, power_ups, destructibles, texts = [], [], [], [], [], [], []
-    rival_ai = None
-
-    spawn_t = 0.0
-    spawn_orb_t = 0.0
-    spawn_obstacle_t = 0.0
-    spawn_power_up_t = 0.0
-    spawn_destructible_t = 0.0
-
-    paused = False
-    time_t = 0.0
-    near_miss_dist = 26
-    near_miss_cooldown = 0.2
-    near_timer = 0.0
-
-    current_weather = None
-    weather_change_timer = random.uniform(15, 30)
-    road_grip_factor = 1.0
-
-    def banner(text_top, text_bottom, color=(0,255,220)):
-        s = pygame.Surface((W, 120), pygame.SRCALPHA)
-        draw_neon_rect(s, (10, 10, W - 20, 100), color, thickness=2, glow=16)
-        big = font.render(text_top, True, (240, 240, 255))
-        s.blit(big, (W//2 - big.get_width()//2, 16))
-        sm = small.render(text_bottom, True, (220, 230, 255))
-        s.blit(sm, (W//2 - sm.get_width()//2, 62))
-        return s
-    banner_surf = banner(f"LEVEL 1 • {params['name']}", "New rule: traffic weaves & spreads across the whole street!")
-    banner_timer = 2.4
-
-    running = True
-    while running:
-        dt = clock.tick(60) / 1000.0
-        time_t += dt
-        near_timer = max(0.0, near_timer - dt)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE: running = False
-                elif event.key == pygame.K_p: paused = not paused
-                elif event.key == pygame.K_r:
-                    score = 0; distance = 0
-                    particles.clear(); traffics.clear(); orbs.clear(); obstacles.clear(); power_ups.clear(); destructibles.clear(); texts.clear()
-                    rival_ai = None
-                    spawn_t = spawn_orb_t = spawn_obstacle_t = spawn_power_up_t = spawn_destructible_t = 0
-                    player.rect.centerx = W//2; player.speed = 140; player.nitro = 0; player.alive = True
-                    player.invincible_timer = 0; player.score_multiplier_timer = 0
-                    current_weather = None; road_grip_factor = 1.0; weather_change_timer = random.uniform(15, 30)
-                    banner_surf = banner(f"LEVEL {level_index+1} • {params['name']}", "Restarted!")
-                    banner_timer = 1.2
+                        return car_types_list[selected_car_index], (best_replay if race_ghost else None)
 
-        keys = pygame.key.get_pressed()
-        if paused:
-            draw_parallax_city(screen, time_t, params["palette"], current_weather, params["background_theme"])
-            draw_road(screen, road_left, road_right, time_t, weather_effect=current_weather)
-            for t in traffics: t.draw(screen)
-            if rival_ai: rival_ai.draw(screen)
-            for o in orbs: o.draw(screen)
-            for obs in obstacles: obs.draw(screen)
-            for pu in power_ups: pu.draw(screen)
-            for de in destructibles: de.draw(screen)
-            for p in particles: p.draw(screen)
-            player.draw(screen)
-            draw_hud(screen, font, small, score, distance, params["goal"], player.speed, player.nitro, params["name"], paused=True, player_invincible=player.is_invincible(), score_multiplier_active=player.score_multiplier_timer > 0)
-            pygame.display.flip()
-            continue
-
-        player.update(dt, keys, (road_left + 14, road_right - 14), road_grip_factor)
-
-        weather_change_timer -= dt
-        if weather_change_timer <= 0:
+def wait_for_dismiss(screen, frame=None, keys=(pygame.K_ESCAPE, pygame.K_q, pygame.K_r)):
+    idle = IdleScreen(screen, max_fps=HOLD_FPS)
+    if frame is not None: screen.blit(frame, (0, 0))
+    while True:
+        for event in idle.wait():
+            if event.type == pygame.QUIT: return None
+            if event.type == pygame.KEYDOWN and event.key in keys: return event.key
+        if frame is not None and idle.dirty: screen.blit(frame, (0, 0))
+
+def level_params(i):
+    name, goal, traffic_rate, max_spd, orb_rate, nm_score, palette, activity, background_theme = LEVELS[i]
+    return {"name": name, "goal": goal, "traffic_rate": traffic_rate, "max_spd": max_spd,
+            "orb_rate": orb_rate, "nm_score": nm_score, "palette": palette, "activity": activity, "background_theme": background_theme}
+
+class World:
+    def __init__(self, W, H, car_type="Standard", level_index=0, road_margin=None, seed=None):
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.car_type = car_type
+        self.start_level = level_index
+        self.W, self.H = W, H
+        if road_margin is None: road_margin = round(W * ROAD_MARGIN)
+        self.road_left = road_margin
+        self.road_right = W - road_margin
+        self.player = Player(W // 2, int(H * 0.72), car_type)
+        self.particles = ParticleSystem(capacity=4096, atlas=sprite_atlas, seed=[self.seed, 1])
+        self.broadphase = SpatialHash(cell_size=128)
+        self.traffic = TrafficSystem((self.road_left, self.road_right), self.rng)
+        self.pools = {cls: Pool(cls) for cls in (Orb, Obstacle, PowerUp, DestructibleElement, FloatingText)}
+        self.orbs, self.obstacles, self.power_ups, self.destructibles, self.texts = [], [], [], [], []
+        self.profiler = None
+        self.near_miss_dist = 26
+        self.near_miss_cooldown = 0.2
+        self.time_t = 0.0
+        self.score = 0
+        self.won = False
+        self.level_index = level_index
+        self.params = level_params(level_index)
+        self.player.set_max_speed_from_level(self.params["max_spd"])
+        self.reset_level()
+        self.show_banner(f"LEVEL {level_index+1} • {self.params['name']}", "New rule: traffic weaves & spreads across the whole street!", 2.4)
+
+    @property
+    def crashed(self): return not self.player.alive
+
+    def counts(self):
+        return {"traffics": len(self.traffic) + (1 if self.rival_ai else 0), "particles": len(self.particles), "orbs": len(self.orbs),
+                "obstacles": len(self.obstacles), "power_ups": len(self.power_ups), "destructibles": len(self.destructibles), "texts": len(self.texts)}
+
+    def weather_intensity(self):
+        elapsed = self.weather_duration - self.weather_change_timer
+        return clamp(min(elapsed, self.weather_change_timer) / WEATHER_FADE, 0.0, 1.0)
+
+    def show_banner(self, top, bottom, duration, color=(0, 255, 220)):
+        self.banner = (top, bottom, color)
+        self.banner_timer = duration
+
+    def reset_level(self):
+        self.distance = 0
+        self.particles.clear()
+        pools = self.pools
+        self.traffic.clear()
+        pools[Orb].release_all(self.orbs); pools[Obstacle].release_all(self.obstacles); pools[PowerUp].release_all(self.power_ups)
+        pools[DestructibleElement].release_all(self.destructibles); pools[FloatingText].release_all(self.texts)
+        self.orbs, self.obstacles, self.power_ups, self.destructibles, self.texts = [], [], [], [], []
+        self.rival_ai = None
+        self.timeline = SpawnTimeline(self.params, (self.road_left, self.road_right), seed=f"{self.seed}/{self.level_index}")
+        self.near_timer = 0.0
+        player = self.player
+        player.alive = True
+        player.invincible_timer = 0; player.score_multiplier_timer = 0
+        self.current_weather = None; self.road_grip_factor = 1.0; self.weather_change_timer = self.weather_duration = self.rng.uniform(15, 30)
+
+    def restart_level(self):
+        self.score = 0
+        self.won = False
+        self.reset_level()
+        player = self.player
+        player.place(self.W//2 - player.rect.w//2, player.y); player.speed = 140; player.nitro = 0
+        self.show_banner(f"LEVEL {self.level_index+1} • {self.params['name']}", "Restarted!", 1.2)
+
+    def next_level(self):
+        if self.level_index + 1 >= len(LEVELS):
+            self.won = True
+            return
+        self.level_index += 1
+        self.params = level_params(self.level_index)
+        player = self.player
+        player.set_max_speed_from_level(self.params["max_spd"])
+        self.reset_level()
+        player.place((self.road_left + self.road_right)//2 - player.rect.w//2, player.y)
+        player.speed = max(160, player.speed * 0.75)
+        player.nitro = clamp(player.nitro + 20, 0, player.nitro_max)
+        self.show_banner(f"LEVEL {self.level_index+1} • {self.params['name']}", "Heavier traffic, more weaving. Keep those near-misses coming!", 2.2)
+
+    def spawn(self, cls, *args):
+        return self.pools[cls].acquire(*args)
+
+    def spawn_event(self, kind, args):
+        if kind == "traffic":
+            if self.traffic.lane_clear(args[0]): self.traffic.spawn(args[0], -140, self.params["activity"])
+        elif kind == "rival":
+            if self.rival_ai is None:
+                self.rival_ai = RivalAI(self.W // 2, -200, self.params["activity"], (self.road_left, self.road_right), self.rng)
+        elif kind == "orb": self.orbs.append(self.spawn(Orb, *args))
+        elif kind == "obstacle": self.obstacles.append(self.spawn(Obstacle, *args))
+        elif kind == "power_up": self.power_ups.append(self.spawn(PowerUp, *args))
+        elif kind == "destructible": self.destructibles.append(self.spawn(DestructibleElement, *args))
+
+    def float_text(self, x, y, text, color=(255, 255, 255)):
+        self.texts.append(self.pools[FloatingText].acquire(x, y, text, color))
+
+    def crash(self, message, penalty, color=(255, 90, 120)):
+        player = self.player
+        player.alive = False
+        crash_burst(self.particles, player.rect.center)
+        self.float_text(player.rect.centerx, player.rect.top, message, color=color)
+        self.score = max(0, self.score - penalty)
+
+    def step(self, dt, inputs):
+        if inputs & INPUT_RESTART: self.restart_level()
+        if self.won: return
+        W, H = self.W, self.H
+        road_left, road_right = self.road_left, self.road_right
+        params, player, particles, texts = self.params, self.player, self.particles, self.texts
+        self.time_t += dt
+        self.near_timer = max(0.0, self.near_timer - dt)
+        self.banner_timer = max(0.0, self.banner_timer - dt)
+
+        player.update(dt, inputs, (road_left + 14, road_right - 14), self.road_grip_factor)
+        prof = self.profiler
+        if prof: prof.mark("update")
+
+        self.weather_change_timer -= dt
+        if self.weather_change_timer <= 0:
             weather_options = [None, "rain", "fog"]
-            current_weather = random.choice(weather_options)
-            weather_change_timer = random.uniform(20, 40)
-            if current_weather == "rain":
-                road_grip_factor = 0.7
-                texts.append(FloatingText(W//2, H//4, "RAIN! Reduced Grip!", color=(150, 150, 200)))
-            elif current_weather == "fog":
-                road_grip_factor = 0.9
-                texts.append(FloatingText(W//2, H//4, "FOG! Low Visibility!", color=(180, 180, 180)))
-            else:
-                road_grip_factor = 1.0
-                texts.append(FloatingText(W//2, H//4, "Clear Skies!", color=(200, 255, 200)))
-
-        spawn_t -= dt
-        if spawn_t <= 0:
-            tr = params["traffic_rate"]
-            spawn_t = clamp(1.1 / tr, 0.16, 0.9)
-            width = road_right - road_left
-            lane_w = width / 5
-            lane = random.randint(0, 4)
-            x = road_left + lane * lane_w + random.uniform(0.15, 0.85) * lane_w
-            safe = True
-            for v in traffics:
-                if abs(v.rect.centerx - x) < 45 and v.rect.top < 140:
-                    safe = False; break
-            if safe:
-                traffics.append(Traffic(x, -140, params["activity"], (road_left, road_right)))
-
-        if rival_ai is None and random.random() < 0.001 * dt * 60:
-            rival_ai = RivalAI(W // 2, -200, params["activity"], (road_left, road_right))
-
-        spawn_orb_t -= dt
-        if spawn_orb_t <= 0:
-            spawn_orb_t = clamp(2.1 / params["orb_rate"], 0.35, 2.8)
-            width = road_right - road_left
-            x = road_left + random.uniform(0.12, 0.88) * width
-            orbs.append(Orb(x, -30))
-
-        spawn_obstacle_t -= dt
-        if spawn_obstacle_t <= 0:
-            spawn_obstacle_t = random.uniform(1.5, 3.0)
-            obs_width = random.randint(30, 80)
-            obs_height = random.randint(20, 60)
-            obs_x = random.randint(road_left, road_right - obs_width)
-            obstacles.append(Obstacle(obs_x, -obs_height, obs_width, obs_height))
-
-        spawn_power_up_t -= dt
-        if spawn_power_up_t <= 0:
-            spawn_power_up_t = random.uniform(5.0, 10.0)
-            power_up_types = ["invincibility", "speed_boost", "score_multiplier"]
-            chosen_type = random.choice(power_up_types)
-            pu_x = random.randint(road_left + 20, road_right - 20)
-            power_ups.append(PowerUp(pu_x, -50, chosen_type))
-
-        spawn_destructible_t -= dt
-        if spawn_destructible_t <= 0:
-            spawn_destructible_t = random.uniform(0.8, 2.0)
-            side = random.choice(["left", "right"])
-            de_width = random.randint(15, 30)
-            de_height = random.randint(20, 40)
-            if side == "left":
-                de_x = random.randint(road_left - 50, road_left - de_width - 10)
+            self.current_weather = self.rng.choice(weather_options)
+            self.weather_change_timer = self.weather_duration = self.rng.uniform(20, 40)
+            if self.current_weather == "rain":
+                self.road_grip_factor = 0.7
+                self.float_text(W//2, H//4, "RAIN! Reduced Grip!", color=(150, 150, 200))
+            elif self.current_weather == "fog":
+                self.road_grip_factor = 0.9
+                self.float_text(W//2, H//4, "FOG! Low Visibility!", color=(180, 180, 180))
             else:
-                de_x = random.randint(road_right + 10, road_right + 50 - de_width)
-            destructibles.append(DestructibleElement(de_x, -de_height, de_width, de_height))
-
-        for t in traffics: t.update(dt, player.speed, player.rect)
-        if rival_ai: rival_ai.update(dt, player.speed, player.rect)
-        for o in orbs: o.update(dt, player.speed)
-        for obs in obstacles: obs.update(dt, player.speed)
-        for pu in power_ups: pu.update(dt, player.speed)
-        for de in destructibles: de.update(dt, player.speed)
-        for p in particles: p.update(dt)
-        particles = [p for p in particles if p.alive()]
-        texts = [tx for tx in texts if tx.alive()]
+                self.road_grip_factor = 1.0
+                self.float_text(W//2, H//4, "Clear Skies!", color=(200, 255, 200))
+
+        for _, kind, args in self.timeline.due(self.distance): self.spawn_event(kind, args)
+        if prof: prof.mark("spawn")
+
+        self.traffic.update(dt, player.speed, player.rect)
+        if self.rival_ai: self.rival_ai.update(dt, player.speed, player.rect)
+        for o in self.orbs: o.update(dt, player.speed)
+        for obs in self.obstacles: obs.update(dt, player.speed)
+        for pu in self.power_ups: pu.update(dt, player.speed)
+        for de in self.destructibles: de.update(dt, player.speed)
+        particles.update(dt)
+        pools = self.pools
+        texts = self.texts = pools[FloatingText].cull(texts, FloatingText.alive)
         for tx in texts: tx.update(dt)
 
-        H = screen.get_height()
-        traffics = [t for t in traffics if t.rect.top < H + 160]
-        orbs = [o for o in orbs if o.y < H + 60]
-        obstacles = [obs for obs in obstacles if obs.alive(H)]
-        power_ups = [pu for pu in power_ups if pu.alive(H)]
-        destructibles = [de for de in destructibles if de.alive(H)]
-        if rival_ai and rival_ai.rect.top > H + 160: rival_ai = None
+        self.traffic.cull(H + 160)
+        self.orbs = pools[Orb].cull(self.orbs, lambda o: o.y < H + 60)
+        self.obstacles = pools[Obstacle].cull(self.obstacles, lambda obs: obs.alive(H))
+        self.power_ups = pools[PowerUp].cull(self.power_ups, lambda pu: pu.alive(H))
+        self.destructibles = pools[DestructibleElement].cull(self.destructibles, lambda de: de.alive(H))
+        if self.rival_ai and self.rival_ai.rect.top > H + 160: self.rival_ai = None
 
         if player.trail_timer > (0.03 if player.nitro_active else 0.06):
             player.trail_timer = 0.0
-            px, py = player.rect.centerx, player.rect.bottom - 6
-            vspread = 50 if player.nitro_active else 30
-            for _ in range(2 if player.nitro_active else 1):
-                vx = random.uniform(-20, 20)
-                vy = random.uniform(80, 130) + vspread
-                col = (0, 255, 220) if player.nitro_active else (255, 60, 120)
-                particles.append(Particle((px, py), (vx, vy), life=random.uniform(0.25, 0.45), size=random.randint(5,9), color=col))
+            nitro_trail(particles, (player.rect.centerx, player.rect.bottom - 6), player.nitro_active)
 
         score_gain = (player.speed * 0.02) * dt * player.get_score_multiplier()
-        distance += player.speed * dt
-        score += score_gain
+        self.distance += player.speed * dt
+        self.score += score_gain
+        if prof: prof.mark("update")
 
+        self.collide()
+        if prof: prof.mark("collide")
+
+        if player.alive and self.distance >= params["goal"]:
+            self.next_level()
+
+    def collide(self):
+        player, broadphase, particles, texts = self.player, self.broadphase, self.particles, self.texts
         player_box = player.rect.inflate(-10, -18)
+        pcx, pcy = player.rect.center
         if player.alive:
-            for t in traffics:
-                shrink = (-10, -10) if t.kind == "bike" else (-8, -8) if t.kind == "car" else (-6, -6) if t.kind == "van" else (-2, -2)
-                if player_box.colliderect(t.rect.inflate(*shrink)):
-                    if not player.is_invincible():
-                        player.alive = False
-                        for _ in range(50):
-                            ang = random.uniform(0, math.tau)
-                            spd = random.uniform(120, 340)
-                            particles.append(Particle(player.rect.center, (math.cos(ang)*spd, math.sin(ang)*spd), 0.6, random.randint(3,6), (255, 60, 120)))
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top, "CRASH!", color=(255, 90, 120)))
-                        score = max(0, score - 80)
-                    else:
-                        traffics.remove(t)
-                        texts.append(FloatingText(t.rect.centerx, t.rect.top, "BOOM!", color=(255, 255, 0)))
-                        score += 50 * player.get_score_multiplier()
-                    break
+            broadphase.clear()
+            for obs in self.obstacles: broadphase.insert(obs, obs.rect, "obstacle")
+            for de in self.destructibles: broadphase.insert(de, de.rect, "destructible")
+            for pu in self.power_ups: broadphase.insert_point(pu, pu.x, pu.y, "power_up")
+            for o in self.orbs: broadphase.insert_point(o, o.x, o.y, "orb")
+
+            hit = self.traffic.first_hit(player_box)
+            if hit is not None:
+                if not player.is_invincible():
+                    self.crash("CRASH!", 80)
+                else:
+                    rect = self.traffic.rect(hit)
+                    self.traffic.remove(hit)
+                    self.float_text(rect.centerx, rect.top, "BOOM!", color=(255, 255, 0))
+                    self.score += 50 * player.get_score_multiplier()
             
-            if rival_ai and player_box.colliderect(rival_ai.rect.inflate(-8, -8)):
+            if self.rival_ai and player_box.colliderect(self.rival_ai.rect.inflate(-8, -8)):
                 if not player.is_invincible():
-                    player.alive = False
-                    for _ in range(50):
-                        ang = random.uniform(0, math.tau)
-                        spd = random.uniform(120, 340)
-                        particles.append(Particle(player.rect.center, (math.cos(ang)*spd, math.sin(ang)*spd), 0.6, random.randint(3,6), (255, 60, 120)))
-                    texts.append(FloatingText(player.rect.centerx, player.rect.top, "RIVAL CRASH!", color=(255, 90, 120)))
-                    score = max(0, score - 150)
+                    self.crash("RIVAL CRASH!", 150)
                 else:
-                    rival_ai = None
-                    texts.append(FloatingText(player.rect.centerx, player.rect.top, "RIVAL DEFEATED!", color=(255, 200, 0)))
-                    score += 200 * player.get_score_multiplier()
+                    self.rival_ai = None
+                    self.float_text(player.rect.centerx, player.rect.top, "RIVAL DEFEATED!", color=(255, 200, 0))
+                    self.score += 200 * player.get_score_multiplier()
 
-            for obs in obstacles[:]:
+            for obs in broadphase.query(player_box, "obstacle"):
                 if player_box.colliderect(obs.rect):
                     if not player.is_invincible():
-                        player.alive = False
-                        for _ in range(50):
-                            ang = random.uniform(0, math.tau)
-                            spd = random.uniform(120, 340)
-                            particles.append(Particle(player.rect.center, (math.cos(ang)*spd, math.sin(ang)*spd), 0.6, random.randint(3,6), (255, 60, 120)))
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top, "OBSTACLE HIT!", color=(255, 50, 50)))
-                        score = max(0, score - 100)
+                        self.crash("OBSTACLE HIT!", 100, color=(255, 50, 50))
                     else:
-                        obstacles.remove(obs)
-                        texts.append(FloatingText(obs.rect.centerx, obs.rect.top, "SMASH!", color=(255, 255, 0)))
-                        score += 75 * player.get_score_multiplier()
+                        self.obstacles.remove(obs)
+                        self.pools[Obstacle].release(obs)
+                        self.float_text(obs.rect.centerx, obs.rect.top, "SMASH!", color=(255, 255, 0))
+                        self.score += 75 * player.get_score_multiplier()
                     break
 
-            for pu in power_ups[:]:
-                if (abs(pu.x - player.rect.centerx) < 30) and (abs(pu.y - player.rect.centery) < 60):
-                    power_ups.remove(pu)
+            for pu in broadphase.query((pcx - 30, pcy - 60, 60, 120), "power_up"):
+                if (abs(pu.x - pcx) < 30) and (abs(pu.y - pcy) < 60):
+                    self.power_ups.remove(pu)
+                    self.pools[PowerUp].release(pu)
                     if pu.power_type == "invincibility":
                         player.activate_invincibility(5.0)
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top - 20, "INVINCIBLE!", color=(255, 255, 0)))
+                        self.float_text(player.rect.centerx, player.rect.top - 20, "INVINCIBLE!", color=(255, 255, 0))
                     elif pu.power_type == "speed_boost":
                         player.speed = min(player.max_speed * 1.5, player.speed + 100)
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top - 20, "SPEED BOOST!", color=(0, 255, 0)))
+                        self.float_text(player.rect.centerx, player.rect.top - 20, "SPEED BOOST!", color=(0, 255, 0))
                     elif pu.power_type == "score_multiplier":
                         player.activate_score_multiplier(8.0)
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top - 20, "SCORE x2!", color=(255, 165, 0)))
-                    score += 50 * player.get_score_multiplier()
+                        self.float_text(player.rect.centerx, player.rect.top - 20, "SCORE x2!", color=(255, 165, 0))
+                    self.score += 50 * player.get_score_multiplier()
                     break
 
-            for de in destructibles[:]:
+            for de in broadphase.query(player_box, "destructible"):
                 if player_box.colliderect(de.rect):
                     de.hit()
-                    texts.append(FloatingText(de.rect.centerx, de.rect.top, "CRUNCH!", color=(180, 180, 180)))
-                    score += 10 * player.get_score_multiplier()
-                    for _ in range(5):
-                        particles.append(Particle(de.rect.center, (random.uniform(-50, 50), random.uniform(50, 100)), 0.3, random.randint(2,4), (100, 100, 100)))
+                    self.float_text(de.rect.centerx, de.rect.top, "CRUNCH!", color=(180, 180, 180))
+                    self.score += 10 * player.get_score_multiplier()
+                    crunch_burst(particles, de.rect.center)
                     break
 
-        if player.alive and near_timer <= 0:
-            for t in traffics:
-                dy = t.rect.centery - player.rect.centery
-                if 0 < dy < 90:
-                    dx = abs(t.rect.centerx - player.rect.centerx)
-                    if dx < player.rect.w * 0.6 + near_miss_dist:
-                        near_timer = near_miss_cooldown
-                        bonus = params["nm_score"] * player.get_score_multiplier()
-                        score += bonus
-                        player.add_nitro(14)
-                        texts.append(FloatingText(player.rect.centerx, player.rect.top - 14, f"NEAR MISS +{bonus}", color=(255, 255, 200)))
-                        break
+        if player.alive and self.near_timer <= 0:
+            if self.traffic.near_miss(player.rect, player.rect.w * 0.6 + self.near_miss_dist):
+                self.near_timer = self.near_miss_cooldown
+                bonus = self.params["nm_score"] * player.get_score_multiplier()
+                self.score += bonus
+                player.add_nitro(14)
+                self.float_text(player.rect.centerx, player.rect.top - 14, f"NEAR MISS +{bonus}", color=(255, 255, 200))
 
         if player.alive:
-            for o in orbs[:]:
-                if (abs(o.x - player.rect.centerx) < 28) and (abs(o.y - player.rect.centery) < 50):
-                    orbs.remove(o)
-                    score += 25 * player.get_score_multiplier()
+            for o in broadphase.query((pcx - 28, pcy - 50, 56, 100), "orb"):
+                if (abs(o.x - pcx) < 28) and (abs(o.y - pcy) < 50):
+                    self.orbs.remove(o)
+                    self.pools[Orb].release(o)
+                    self.score += 25 * player.get_score_multiplier()
                     player.add_nitro(18)
-                    texts.append(FloatingText(player.rect.centerx, player.rect.top - 12, f"+ORB", color=(0, 255, 220)))
-                    for _ in range(12):
-                        angle = random.uniform(-0.6, 0.6) + math.pi/2
-                        spd = random.uniform(90, 220)
-                        particles.append(Particle((o.x, o.y), (math.cos(angle)*spd, math.sin(angle)*spd), 0.5, random.randint(3,6), (0, 255, 220)))
-
-        if player.alive and distance >= params["goal"]:
-            level_index += 1
-            if level_index >= len(LEVELS):
-                draw_parallax_city(screen, time_t, params["palette"], current_weather, params["background_theme"]); draw_road(screen, road_left, road_right, time_t, weather_effect=current_weather)
-                msg = "YOU WON • Midnight Crown Achieved"
-                sub = f"Final Score: {int(score)}  |  Press ESC to quit or R to replay last level"
-                screen.blit(banner(msg, sub, color=(0,255,220)), (0, screen.get_height()//2 - 60))
-                pygame.display.flip()
-                
-                if firebase_ref:
-                    if not score_submission_prompt(screen, font, small, W, H, score):
-                        return
-                
-                while True:
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT: return
-                        if event.type == pygame.KEYDOWN and (event.key == pygame.K_ESCAPE or event.key == pygame.K_q):
-                            return
-                        if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                            return
-                    clock.tick(60)
+                    self.float_text(player.rect.centerx, player.rect.top - 12, f"+ORB", color=(0, 255, 220))
+                    orb_burst(particles, (o.x, o.y))
+
+class Ghost:
+    def __init__(self, replay, W, H):
+        self.replay = replay
+        self.world = World(W, H, replay.car_type, replay.level_index, seed=replay.seed)
+        self.tick = 0
+        self.dt = 1.0 / replay.tick_hz
+        self.accumulator = 0.0
+        self.surface = self.world.player.surface.copy()
+        self.surface.set_alpha(110)
+
+    @property
+    def finished(self): return self.tick >= len(self.replay) or self.world.crashed or self.world.won
+
+    def step(self, dt):
+        self.accumulator += dt
+        while self.accumulator >= self.dt and not self.finished:
+            self.world.step(self.dt, self.replay.inputs[self.tick])
+            self.tick += 1
+            self.accumulator -= self.dt
+
+    def draw(self, surface, world, alpha=1.0, scale=1.0):
+        if self.finished or self.world.level_index != world.level_index: return
+        sprite = scaled_sprite(self.surface, scale)
+        y = round((world.player.rect.y - (self.world.distance - world.distance)) * scale)
+        if -sprite.get_height() < y < surface.get_height():
+            surface.blit(sprite, (self.world.player.draw_pos(alpha, scale)[0], y))
+
+def make_banner(font, small, W, text_top, text_bottom, color=(0,255,220), scale=1.0):
+    inset = px(10, scale)
+    s = pygame.Surface((W, px(120, scale)), pygame.SRCALPHA)
+    draw_neon_rect(s, (inset, inset, W - inset * 2, px(100, scale)), color, thickness=px(2, scale), glow=px(16, scale))
+    big = font.render(text_top, True, (240, 240, 255))
+    s.blit(big, (W//2 - big.get_width()//2, px(16, scale)))
+    sm = small.render(text_bottom, True, (220, 230, 255))
+    s.blit(sm, (W//2 - sm.get_width()//2, px(62, scale)))
+    return s
+
+class WorldRenderer:
+    def __init__(self, font, small):
+        self.font, self.small = font, small
+        self.banner_key = None
+        self.banner_surf = None
+        self.profiler = None
+
+    def fonts(self, scale):
+        return (self.font, self.small) if scale == 1.0 else game_fonts(scale)
+
+    def banner(self, W, text_top, text_bottom, color=(0,255,220), scale=1.0):
+        return make_banner(*self.fonts(scale), W, text_top, text_bottom, color, scale)
+
+    def draw_scene(self, screen, world, alpha=1.0):
+        params = world.params
+        t = world.time_t - (1.0 - alpha) * SIM_DT
+        prof = self.profiler
+        scale = screen.get_width() / world.W
+        weather_intensity = world.weather_intensity()
+        tier = quality.tier
+        draw_parallax_city(screen, t, params["palette"], world.current_weather, params["background_theme"], weather_intensity,
+                           tier["parallax"], tier["rain_layers"], scale)
+        if prof: prof.mark("background")
+        draw_road(screen, world.road_left, world.road_right, t, weather_effect=world.current_weather, weather_intensity=weather_intensity, scale=scale)
+        if prof: prof.mark("road")
+
+    def draw(self, screen, world, paused=False, ghost=None, alpha=1.0):
+        scale = screen.get_width() / world.W
+        (font, small), player = self.fonts(scale), world.player
+        self.draw_scene(screen, world, alpha)
+
+        for o in world.orbs: o.draw(screen, alpha, scale)
+        world.traffic.draw(screen, alpha, scale)
+        if world.rival_ai: world.rival_ai.draw(screen, alpha, scale)
+        for obs in world.obstacles: obs.draw(screen, alpha, scale)
+        for pu in world.power_ups: pu.draw(screen, alpha, scale)
+        for de in world.destructibles: de.draw(screen, alpha, scale)
+        if ghost: ghost.draw(screen, world, alpha, scale)
+        player.draw(screen, alpha, scale)
+        world.particles.draw(screen, scale)
+        for tx in world.texts:
+            s = text_cache.render(small, tx.text, tx.color)
+            screen.blit(s, (tx.x * scale - s.get_width()//2, tx.y * scale))
+        if self.profiler: self.profiler.mark("entities")
+
+        draw_hud(screen, font, small, world.score, world.distance, world.params["goal"], player.speed, player.nitro, world.params["name"], paused=paused, player_invincible=player.is_invincible(), score_multiplier_active=player.score_multiplier_timer > 0, scale=scale)
+
+        if world.banner_timer > 0 and not paused:
+            if (world.banner, scale) != self.banner_key:
+                self.banner_key = (world.banner, scale)
+                self.banner_surf = self.banner(screen.get_width(), *world.banner, scale=scale)
+            screen.blit(self.banner_surf, (0, px(60, scale)))
+        if self.profiler: self.profiler.mark("hud")
+
+frame_profiler = FrameProfiler()
+quality = QualityGovernor(os.environ.get("MD_QUALITY", "Auto").capitalize(), budget_ms=1000.0 / RENDER_FPS)
+viewport = Viewport(parse_scale(os.environ.get("MD_RENDER_SCALE", "100")))
+
+def apply_quality(world):
+    tier = quality.tier
+    world.particles.density = tier["particles"]
+    world.particles.limit = tier["particle_cap"]
+
+def present_profile(screen, font, prof, world):
+    prof.draw(screen, font)
+    prof.mark("overlay")
+    pygame.display.flip()
+    prof.mark("flip")
+    prof.end_frame(world.counts())
+
+def save_replay(replay, world):
+    if not replay.inputs: return
+    replay.finish(world.score, world.distance)
+    try:
+        print(f"Replay saved to {save_run(replay)}.")
+    except OSError as e:
+        print(f"Error saving replay: {e}")
+
+def game_loop(screen, font, small, W, H, selected_car_type, ghost_replay=None, leaderboard=None):
+    clock = pygame.time.Clock()
+    ghost = Ghost(ghost_replay, W, H) if ghost_replay else None
+    world = World(W, H, selected_car_type, seed=ghost_replay.seed if ghost_replay else None)
+    replay = Replay(world.seed, SIM_HZ, world.start_level, selected_car_type)
+    renderer = WorldRenderer(font, small)
+    canvas = viewport.target(screen)
+    scale = canvas.get_width() / W
+    weather.warm(canvas.get_size(), (round(world.road_left * scale), round(world.road_right * scale)), scale=scale)
+    apply_quality(world)
+    overlay_font = get_font("Consolas", 14)
+    paused = False
+    accumulator = 0.0
+    pending_inputs = 0
+
+    running = True
+    while running:
+        dt = clock.tick(RENDER_FPS) / 1000.0
+        if quality.sample(dt * 1000.0, clock.get_rawtime()): apply_quality(world)
+        prof = frame_profiler if frame_profiler.enabled else None
+        if prof: prof.begin_frame(dt)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE: running = False
+                elif event.key == pygame.K_p: paused = True
+                elif event.key == pygame.K_r: pending_inputs |= INPUT_RESTART
+                elif event.key == pygame.K_F3: frame_profiler.toggle()
+                elif event.key == pygame.K_F4 and frame_profiler.frames:
+                    print(f"Frame profile written to {frame_profiler.dump_csv()}.")
+        world.profiler = renderer.profiler = prof
+        if prof: prof.mark("input")
+
+        if paused:
+            renderer.draw(canvas, world, paused=True, ghost=ghost, alpha=accumulator / SIM_DT)
+            viewport.present(screen, canvas)
+            frame = screen.copy()
+            while paused:
+                key = wait_for_dismiss(screen, frame, (pygame.K_p, pygame.K_r, pygame.K_ESCAPE))
+                if key == pygame.K_r:
+                    inputs = pending_inputs | INPUT_RESTART
+                    pending_inputs, accumulator = 0, 0.0
+                    world.step(SIM_DT, inputs)
+                    replay.record(inputs)
+                    if ghost: ghost.step(SIM_DT)
+                    renderer.draw(canvas, world, paused=True, ghost=ghost)
+                    viewport.present(screen, canvas)
+                    frame = screen.copy()
+                else: paused = False
+                if key in (None, pygame.K_ESCAPE): running = False
+            clock.tick()
+            continue
+
+        accumulator = min(accumulator + dt, 0.25)
+        keys = pygame.key.get_pressed()
+        while accumulator >= SIM_DT and not (world.crashed or world.won):
+            inputs = inputs_from_keys(keys) | pending_inputs
+            pending_inputs = 0
+            world.step(SIM_DT, inputs)
+            replay.record(inputs)
+            if ghost:
+                ghost.step(SIM_DT)
+                if prof: prof.mark("ghost")
+            accumulator -= SIM_DT
+        alpha = accumulator / SIM_DT if not (world.crashed or world.won) else 1.0
+
+        if world.won:
+            save_replay(replay, world)
+            renderer.draw_scene(canvas, world)
+            viewport.present(screen, canvas)
+            msg = "YOU WON • Midnight Crown Achieved"
+            sub = f"Final Score: {int(world.score)}  |  Press ESC to quit or R to replay last level"
+            screen.blit(renderer.banner(W, msg, sub, color=(0,255,220)), (0, H//2 - 60))
+            frame = screen.copy()
+            pygame.display.flip()
             
-            params = level_params(level_index)
-            player.set_max_speed_from_level(params["max_spd"])
-            distance = 0
-            particles.clear(); traffics.clear(); orbs.clear(); obstacles.clear(); power_ups.clear(); destructibles.clear(); texts.clear()
-            rival_ai = None
-            spawn_t = spawn_orb_t = spawn_obstacle_t = spawn_power_up_t = spawn_destructible_t = 0
-            player.rect.centerx = (road_left + road_right)//2
-            player.speed = max(160, player.speed * 0.75)
-            player.nitro = clamp(player.nitro + 20, 0, player.nitro_max)
-            player.alive = True
-            player.invincible_timer = 0; player.score_multiplier_timer = 0
-            current_weather = None; road_grip_factor = 1.0; weather_change_timer = random.uniform(15, 30)
-            banner_surf = banner(f"LEVEL {level_index+1} • {params['name']}", "Heavier traffic, more weaving. Keep those near-misses coming!")
-            banner_timer = 2.2
-
-        draw_parallax_city(screen, time_t, params["palette"], current_weather, params["background_theme"])
-        draw_road(screen, road_left, road_right, time_t, weather_effect=current_weather)
-
-        for o in orbs: o.draw(screen)
-        for t in traffics: t.draw(screen)
-        if rival_ai: rival_ai.draw(screen)
-        for obs in obstacles: obs.draw(screen)
-        for pu in power_ups: pu.draw(screen)
-        for de in destructibles: de.draw(screen)
-        player.draw(screen)
-        for p in particles: p.draw(screen)
-        for tx in texts:
-            s = small.render(tx.text, True, tx.color)
-            screen.blit(s, (tx.x - s.get_width()//2, tx.y))
-
-        draw_hud(screen, font, small, score, distance, params["goal"], player.speed, player.nitro, params["name"], paused=False, player_invincible=player.is_invincible(), score_multiplier_active=player.score_multiplier_timer > 0)
-
-        if banner_timer > 0:
-            banner_timer -= dt
-            screen.blit(banner_surf, (0, 60))
-
-        if not player.alive:
-            overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
-            overlay.fill((6, 8, 14, 160))
-            screen.blit(overlay, (0, 0))
+            if not score_submission_prompt(screen, font, small, W, H, world.score, leaderboard or get_leaderboard_service()):
+                return
+            
+            wait_for_dismiss(screen, frame)
+            return
+
+        renderer.draw(canvas, world, ghost=ghost, alpha=alpha)
+        viewport.present(screen, canvas)
+        if prof: prof.mark("upscale")
+
+        if world.crashed:
+            save_replay(replay, world)
+            dim(screen)
             t1 = font.render("CRASHED", True, (255, 120, 140))
             t2 = small.render("Press R to restart level • ESC to quit", True, (230, 230, 255))
             screen.blit(t1, (W//2 - t1.get_width()//2, H//2 - 30))
             screen.blit(t2, (W//2 - t2.get_width()//2, H//2 + 10))
+            frame = screen.copy()
             pygame.display.flip()
 
-            if firebase_ref:
-                if not score_submission_prompt(screen, font, small, W, H, score):
-                    return
+            if not score_submission_prompt(screen, font, small, W, H, world.score, leaderboard or get_leaderboard_service()):
+                return
             
-            while True:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT: return
-                    if event.type == pygame.KEYDOWN and (event.key == pygame.K_ESCAPE or event.key == pygame.K_q):
-                        return
-                    if event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                        return
-                clock.tick(60)
+            wait_for_dismiss(screen, frame)
+            return
+
+        if prof: present_profile(screen, overlay_font, prof, world)
+        else: pygame.display.flip()
 
+    save_replay(replay, world)
     return
 
 if __name__ == "__main__":
     pygame.init()
     pygame.display.set_caption("Midnight Drag")
     W, H = 900, 600
-    screen = pygame.display.set_mode((W, H))
-    font = pygame.font.SysFont("Montserrat", 28)
-    small = pygame.font.SysFont("Montserrat", 18)
+    flags = pygame.SCALED | pygame.RESIZABLE | (pygame.FULLSCREEN if os.environ.get("MD_FULLSCREEN") else 0)
+    screen = pygame.display.set_mode((W, H), flags)
+    startup.mark("open window")
+    leaderboard = get_leaderboard_service()
+    leaderboard.start()
+    warm_sprite_atlas()
+    warm_vehicle_cache()
+    startup.mark("warm sprite caches")
+    font, small = game_fonts()
 
     while True:
-        selected_car = main_menu(screen, font, small, W, H)
-        if selected_car:
-            game_loop(screen, font, small, W, H, selected_car)
+        selection = main_menu(screen, font, small, W, H, leaderboard)
+        if selection:
+            selected_car, ghost_replay = selection
+            game_loop(screen, font, small, W, H, selected_car, ghost_replay, leaderboard)
         else:
             break
 
+    stats = sprite_atlas.stats()
+    print(f"Sprite atlas: {stats['sprites']} sprites, {stats['bytes'] / 1024:.0f} KiB, hit rate {stats['hit_rate']:.1%}")
     pygame.quit()
     sys.exit()
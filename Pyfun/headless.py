@@ -0,0 +1,77 @@
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import game
+
+def autopilot(world):
+    player = world.player
+    inputs = game.INPUT_ACCEL
+    px = player.rect.centerx
+    threats = world.traffic.rects() + [obs.rect for obs in world.obstacles]
+    if world.rival_ai: threats.append(world.rival_ai.rect)
+    ahead = [r for r in threats if player.rect.top - 260 < r.bottom < player.rect.bottom + 10 and abs(r.centerx - px) < 70]
+    if ahead:
+        nearest = max(ahead, key=lambda r: r.bottom)
+        room_left = px - world.road_left
+        room_right = world.road_right - px
+        if nearest.centerx > px or (nearest.centerx == px and room_left > room_right):
+            inputs |= game.INPUT_LEFT
+        else:
+            inputs |= game.INPUT_RIGHT
+        if player.nitro > 0 and nearest.bottom < player.rect.top - 180: inputs |= game.INPUT_NITRO
+    return inputs
+
+def run_level(level_index, ticks, dt, car_type="Standard", policy=autopilot, W=900, H=600):
+    world = game.World(W, H, car_type, level_index=level_index)
+    crashes = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        world.step(dt, policy(world))
+        if world.crashed:
+            crashes += 1
+            world.restart_level()
+        if world.won or world.level_index != level_index:
+            break
+    elapsed = time.perf_counter() - start
+    return {"level": level_index, "name": game.LEVELS[level_index][0], "ticks": tick + 1,
+            "sim_seconds": (tick + 1) * dt, "wall_seconds": elapsed,
+            "ticks_per_second": (tick + 1) / elapsed if elapsed else float("inf"),
+            "completed": world.won or world.level_index != level_index,
+            "crashes": crashes, "score": int(world.score)}
+
+def print_timeline(level_index, until, seed=0, W=900):
+    world = game.World(W, 600, level_index=level_index, seed=seed)
+    events = world.timeline.peek(until)
+    print(f"{level_index:2d} {game.LEVELS[level_index][0]} • {len(events)} events in {until:.0f} m")
+    for at, kind, args in events:
+        print(f"   {at:8.1f}  {kind:<12} {' '.join(str(round(a, 1)) if isinstance(a, float) else str(a) for a in args)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Midnight Drag levels without a window.")
+    parser.add_argument("--levels", type=int, nargs="*", default=None, help="level indices to run (default: all)")
+    parser.add_argument("--ticks", type=int, default=20000, help="maximum ticks per level")
+    parser.add_argument("--dt", type=float, default=game.SIM_DT, help="simulation step in seconds")
+    parser.add_argument("--car", default="Standard", choices=list(game.CAR_TYPES))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timeline", type=float, default=None, metavar="DISTANCE",
+                        help="print each level's spawn events up to this distance instead of running it")
+    args = parser.parse_args()
+
+    if args.seed is not None: random.seed(args.seed)
+    levels = args.levels if args.levels else range(len(game.LEVELS))
+    if args.timeline is not None:
+        for i in levels: print_timeline(i, args.timeline, args.seed or 0)
+        return
+    for i in levels:
+        r = run_level(i, args.ticks, args.dt, args.car)
+        print(f"{r['level']:2d} {r['name']:<18} {'done' if r['completed'] else 'open':<4} "
+              f"ticks={r['ticks']:<6d} sim={r['sim_seconds']:7.1f}s crashes={r['crashes']:<3d} "
+              f"score={r['score']:<6d} {r['ticks_per_second']:8.0f} ticks/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from scorelog import ScoreLog
+
+class LeaderboardError(Exception): pass
+
+class FirebaseConnection:
+    def __init__(self, credentials_path, database_url, path="leaderboard"):
+        self.credentials_path = credentials_path
+        self.database_url = database_url
+        self.path = path
+        self.status = "idle"
+        self.connect_seconds = None
+        self.future = Future()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.status == "offline": self.status, self.future = "idle", Future()
+            if self.status != "idle": return self.future
+            self.status = "connecting"
+            future = self.future
+        threading.Thread(target=self._connect, args=(future,), name="firebase-init", daemon=True).start()
+        return future
+
+    def _connect(self, future):
+        start = time.perf_counter()
+        try:
+            import firebase_admin
+            from firebase_admin import credentials, db
+            try:
+                firebase_admin.get_app()
+            except ValueError:
+                cred = credentials.Certificate(self.credentials_path)
+                firebase_admin.initialize_app(cred, {"databaseURL": self.database_url})
+            ref = db.reference(self.path)
+        except Exception as e:
+            self.connect_seconds = time.perf_counter() - start
+            self.status = "offline"
+            print(f"Error initializing Firebase: {e}")
+            future.set_exception(e)
+        else:
+            self.connect_seconds = time.perf_counter() - start
+            self.status = "ready"
+            print(f"Firebase initialized successfully in {self.connect_seconds:.2f} s.")
+            future.set_result(ref)
+
+    def reference(self):
+        try:
+            return self.start().result()
+        except Exception as e:
+            raise LeaderboardError(f"Firebase unavailable: {e}") from e
+
+    def order_by_child(self, key): return self.reference().order_by_child(key)
+
+    def update(self, value): return self.reference().update(value)
+
+def rank(entries, limit=10):
+    board = [(value.get("name", "Unknown"), value.get("score", 0)) for value in entries.values()]
+    board.sort(key=lambda x: x[1], reverse=True)
+    return board[:limit]
+
+class LeaderboardCache:
+    def __init__(self, limit=10, ttl=60.0, path=None):
+        self.limit = limit
+        self.ttl = ttl
+        self.path = path
+        self.entries = {}
+        self.fetched_at = None
+        self.version = 0
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.saved_version = -1
+        self.pending = set()
+        if path: self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.entries = data["entries"]
+            self.fetched_at = data["fetched_at"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading leaderboard cache: {e}")
+
+    def _snapshot(self):
+        return self.version, {"entries": dict(self.entries), "fetched_at": self.fetched_at}
+
+    def save(self, snapshot=None):
+        if not self.path: return
+        if snapshot is None:
+            with self._lock: snapshot = self._snapshot()
+        version, data = snapshot
+        with self._save_lock:
+            if version <= self.saved_version: return
+            try:
+                tmp = self.path + ".tmp"
+                with open(tmp, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp, self.path)
+                self.saved_version = version
+            except OSError as e:
+                print(f"Error saving leaderboard cache: {e}")
+
+    def top(self):
+        with self._lock:
+            return rank(self.entries, self.limit)
+
+    def stale(self):
+        return self.fetched_at is None or time.time() - self.fetched_at > self.ttl
+
+    def _changed(self):
+        top = sorted(self.entries.items(), key=lambda kv: kv[1].get("score", 0), reverse=True)
+        self.entries = dict(top[:self.limit])
+        self.version += 1
+        return self._snapshot()
+
+    def _notify(self, snapshot):
+        self.save(snapshot)
+        for listener in self.listeners: listener()
+
+    def _merge(self, changes):
+        for key, value in changes.items():
+            if value is None: self.entries.pop(key, None)
+            else: self.entries[key] = value
+        return self._changed()
+
+    def replace(self, entries):
+        with self._lock:
+            local = {k: v for k, v in self.entries.items() if k in self.pending}
+            self.entries = {**dict(entries or {}), **local}
+            self.fetched_at = time.time()
+            snapshot = self._changed()
+        self._notify(snapshot)
+
+    def merge(self, changes):
+        with self._lock:
+            snapshot = self._merge(changes)
+        self._notify(snapshot)
+
+    def add_pending(self, entries):
+        with self._lock:
+            self.pending.update(entries)
+            snapshot = self._merge(entries)
+        self._notify(snapshot)
+
+    def confirm(self, keys):
+        with self._lock:
+            self.pending.difference_update(keys)
+
+    def apply_event(self, event):
+        parts = [p for p in (event.path or "/").split("/") if p]
+        if not parts:
+            if event.event_type == "put": self.replace(event.data)
+            else: self.merge(event.data or {})
+        elif len(parts) == 1:
+            self.merge({parts[0]: event.data})
+        else:
+            with self._lock:
+                current = self.entries.get(parts[0])
+                if current is None: return
+                value = dict(current)
+                value[parts[1]] = event.data
+            self.merge({parts[0]: value})
+
+class FirebaseTransport:
+    def __init__(self, ref):
+        self.ref = ref
+
+    @property
+    def status(self): return getattr(self.ref, "status", "ready")
+
+    def top(self, limit):
+        return self.ref.order_by_child("score").limit_to_last(limit).get() or {}
+
+    def update(self, entries):
+        self.ref.update(entries)
+
+    def listen(self, callback):
+        if not hasattr(self.ref, "listen"): return None
+        return self.ref.listen(callback)
+
+class LeaderboardService:
+    def __init__(self, transport=None, limit=10, cache=None, log=None, batch_size=50, backoff=(1.0, 60.0)):
+        self.transport = transport
+        self.limit = limit
+        self.cache = cache if cache is not None else LeaderboardCache(limit)
+        self.log = log if log is not None else ScoreLog()
+        self.batch_size = batch_size
+        self.backoff = backoff
+        self.refreshing = None
+        self.listener = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="leaderboard")
+        self.flusher = None
+        self.waiters = {}
+        self.wakeup = threading.Event()
+
+    @property
+    def status(self): return "offline" if self.transport is None else self.transport.status
+
+    @property
+    def available(self): return self.status != "offline"
+
+    def _call(self, action, fn, *args):
+        if self.transport is None:
+            raise LeaderboardError("Firebase not initialized")
+        try:
+            return fn(*args)
+        except LeaderboardError:
+            raise
+        except Exception as e:
+            raise LeaderboardError(f"{action} failed: {e}") from e
+
+    def start(self):
+        if self.flusher is not None: return
+        self.log.recover()
+        if self.log.pending: self.cache.add_pending(dict(self.log.pending))
+        self.flusher = threading.Thread(target=self._flush_loop, name="score-flush", daemon=True)
+        self.flusher.start()
+
+    def submit(self, name, score):
+        self.start()
+        entry = {"name": name, "score": score}
+        key = self.log.new_key()
+        future = self.waiters[key] = Future()
+        self.cache.add_pending({key: entry})
+        try:
+            self.log.append(entry, key)
+        except OSError:
+            self.waiters.pop(key, None)
+            self.cache.confirm([key])
+            self.cache.merge({key: None})
+            raise
+        self.wakeup.set()
+        return future
+
+    def _flush_loop(self):
+        failures = 0
+        while True:
+            if failures:
+                base, cap = self.backoff
+                self.wakeup.wait(min(cap, base * 2 ** (failures - 1)) * random.uniform(0.5, 1.0))
+            elif not self.log.pending:
+                self.wakeup.wait()
+            self.wakeup.clear()
+            batch = self.log.batch(self.batch_size)
+            if not batch: continue
+            try:
+                self._call("upload", self.transport.update, batch)
+            except LeaderboardError as e:
+                failures += 1
+                print(f"Score upload failed ({len(self.log)} queued), retrying: {e}")
+                for key in batch:
+                    waiter = self.waiters.pop(key, None)
+                    if waiter: waiter.set_exception(LeaderboardError(f"saved offline, will retry ({e})"))
+                continue
+            failures = 0
+            try:
+                self.log.ack(batch)
+            except OSError as e:
+                print(f"Error writing score log: {e}")
+            self.cache.confirm(batch)
+            for key in batch:
+                waiter = self.waiters.pop(key, None)
+                if waiter: waiter.set_result(key)
+
+    def top(self):
+        if self.cache.stale() and self.available: self.refresh()
+        return self.cache.top()
+
+    def refresh(self):
+        if self.refreshing is None or self.refreshing.done():
+            self.refreshing = self.executor.submit(self._call, "fetch", self._refresh)
+        return self.refreshing
+
+    def _refresh(self):
+        self.cache.replace(self.transport.top(self.limit))
+        if self.listener is None:
+            try:
+                self.listener = self.transport.listen(self._on_event) or False
+            except Exception as e:
+                print(f"Leaderboard change feed unavailable, will retry: {e}")
+        return self.cache.top()
+
+    def _on_event(self, event):
+        try:
+            self.cache.apply_event(event)
+        except Exception as e:
+            print(f"Error applying leaderboard update: {e}")
+
+    def close(self):
+        if self.listener: self.listener.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,2 @@
+def clamp(x, a, b): return max(a, min(b, x))
+def lerp(a, b, t): return a + (b - a) * t
@@ -0,0 +1,96 @@
+import numpy as np
+
+from atlas import SpriteAtlas
+
+def _sample(rng, value, n, integer=False):
+    if isinstance(value, tuple):
+        lo, hi = value
+        return rng.integers(lo, hi + 1, n) if integer else rng.uniform(lo, hi, n)
+    return np.full(n, value, dtype=np.float64)
+
+class ParticleSystem:
+    def __init__(self, capacity=4096, atlas=None, seed=None, max_alpha=180):
+        self.capacity = capacity
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.ones(capacity, dtype=np.float32)
+        self.t = np.zeros(capacity, dtype=np.float32)
+        self.size = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.palette = []
+        self._palette_index = {}
+        self.atlas = atlas if atlas is not None else SpriteAtlas()
+        self.rng = np.random.default_rng(seed)
+        self.max_alpha = max_alpha
+        self.density = 1.0
+        self.limit = capacity
+
+    def __len__(self): return self.count
+
+    def clear(self): self.count = 0
+
+    def _color_index(self, color):
+        index = self._palette_index.get(color)
+        if index is None:
+            index = self._palette_index[color] = len(self.palette)
+            self.palette.append(color)
+        return index
+
+    def emit(self, x, y, vx, vy, life, size, color):
+        n = min(len(vx), min(self.limit, self.capacity) - self.count)
+        if n <= 0: return 0
+        s = slice(self.count, self.count + n)
+        self.pos[s, 0] = x
+        self.pos[s, 1] = y
+        self.vel[s, 0] = vx[:n]
+        self.vel[s, 1] = vy[:n]
+        self.life[s] = life[:n]
+        self.t[s] = life[:n]
+        self.size[s] = size[:n]
+        self.color[s] = self._color_index(tuple(color))
+        self.count += n
+        return n
+
+    def scaled(self, count):
+        return max(1, round(count * self.density)) if self.density < 1.0 else count
+
+    def burst(self, pos, count, angle, speed, life, size, color):
+        rng = self.rng
+        count = self.scaled(count)
+        ang = _sample(rng, angle, count)
+        spd = _sample(rng, speed, count)
+        return self.emit(pos[0], pos[1], np.cos(ang) * spd, np.sin(ang) * spd,
+                         _sample(rng, life, count), _sample(rng, size, count, integer=True), color)
+
+    def spray(self, pos, count, vx, vy, life, size, color):
+        rng = self.rng
+        count = self.scaled(count)
+        return self.emit(pos[0], pos[1], _sample(rng, vx, count), _sample(rng, vy, count),
+                         _sample(rng, life, count), _sample(rng, size, count, integer=True), color)
+
+    def update(self, dt):
+        n = self.count
+        if n == 0: return
+        self.pos[:n] += self.vel[:n] * dt
+        self.t[:n] -= dt
+        dead = self.t[:n] <= 0
+        alive = n - int(np.count_nonzero(dead))
+        if alive == n: return
+        holes = np.flatnonzero(dead[:alive])
+        fillers = np.flatnonzero(~dead[alive:]) + alive
+        for arr in (self.pos, self.vel, self.life, self.t, self.size, self.color):
+            arr[holes] = arr[fillers]
+        self.count = alive
+
+    def draw(self, surface, scale=1.0):
+        n = self.count
+        if n == 0: return
+        k = np.clip(self.t[:n] / self.life[:n], 0, 1)
+        alpha = (self.max_alpha * k ** 1.5).astype(np.int32)
+        radius = np.maximum(1, (self.size[:n] * (0.6 + 0.4 * k) * scale).astype(np.int32))
+        pos = self.pos[:n] if scale == 1.0 else self.pos[:n] * scale
+        xy = (pos - radius[:, None]).astype(np.int32)
+        disc, palette = self.atlas.disc, self.palette
+        surface.blits([(disc(palette[c], r, a), (x, y)) for c, r, a, (x, y)
+                       in zip(self.color[:n].tolist(), radius.tolist(), alpha.tolist(), xy.tolist())], doreturn=False)
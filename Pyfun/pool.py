@@ -0,0 +1,28 @@
+class Pool:
+    def __init__(self, cls, capacity=256):
+        self.cls = cls
+        self.capacity = capacity
+        self.free = []
+
+    def acquire(self, *args, **kwargs):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args, **kwargs)
+            return obj
+        return self.cls(*args, **kwargs)
+
+    def release(self, obj):
+        if len(self.free) < self.capacity: self.free.append(obj)
+
+    def release_all(self, objs):
+        room = self.capacity - len(self.free)
+        if room > 0: self.free.extend(objs[:room])
+
+    def cull(self, objs, keep):
+        kept, free, capacity = [], self.free, self.capacity
+        for obj in objs:
+            if keep(obj): kept.append(obj)
+            elif len(free) < capacity: free.append(obj)
+        return kept
+
+    def __len__(self): return len(self.free)
@@ -0,0 +1,112 @@
+import csv
+import time
+
+import numpy as np
+import pygame
+
+STAGES = ("input", "spawn", "update", "collide", "ghost", "background", "road", "entities", "hud", "upscale", "overlay", "flip")
+COUNTERS = ("traffics", "particles", "orbs", "obstacles", "power_ups", "destructibles", "texts")
+HIST_BINS = np.arange(0, 42, 2)
+
+class FrameProfiler:
+    def __init__(self, stages=STAGES, counters=COUNTERS, history=600, refresh_ms=250):
+        self.stages = stages
+        self.counters = counters
+        self.index = {name: i for i, name in enumerate(stages)}
+        self.history = history
+        self.refresh_ms = refresh_ms
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.stage_ms = np.zeros((self.history, len(self.stages)), dtype=np.float32)
+        self.frame_ms = np.zeros(self.history, dtype=np.float32)
+        self.counts = np.zeros((self.history, len(self.counters)), dtype=np.int32)
+        self.frames = 0
+        self.current = [0.0] * len(self.stages)
+        self.last = 0.0
+        self.dt = 0.0
+        self.panel = None
+        self.panel_at = -self.refresh_ms
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        if self.enabled: self.reset()
+        return self.enabled
+
+    def begin_frame(self, dt):
+        self.dt = dt
+        self.current = [0.0] * len(self.stages)
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.current[self.index[stage]] += now - self.last
+        self.last = now
+
+    def end_frame(self, counts):
+        row = self.frames % self.history
+        self.stage_ms[row] = self.current
+        self.stage_ms[row] *= 1000.0
+        self.frame_ms[row] = self.dt * 1000.0
+        self.counts[row] = [counts.get(name, 0) for name in self.counters]
+        self.frames += 1
+
+    def window(self, frames=None):
+        n = min(self.frames, self.history, frames or self.history)
+        return np.arange(self.frames - n, self.frames) % self.history
+
+    def summary(self, frames=120):
+        rows = self.window(frames)
+        if not len(rows): return None
+        frame_ms = self.frame_ms[rows]
+        fps = 1000.0 / np.maximum(frame_ms, 1e-3)
+        return {"stages": dict(zip(self.stages, self.stage_ms[rows].mean(axis=0))),
+                "stage_max": dict(zip(self.stages, self.stage_ms[rows].max(axis=0))),
+                "counts": dict(zip(self.counters, self.counts[rows[-1]])),
+                "frame_p50": float(np.percentile(frame_ms, 50)), "frame_p99": float(np.percentile(frame_ms, 99)),
+                "fps_p50": float(np.percentile(fps, 50)), "fps_p1": float(np.percentile(fps, 1)),
+                "histogram": np.histogram(np.minimum(self.frame_ms[self.window()], HIST_BINS[-1] - 0.01), HIST_BINS)[0]}
+
+    def dump_csv(self, path=None):
+        path = path or time.strftime("profile-%Y%m%d-%H%M%S.csv")
+        rows = self.window()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms", *(f"{s}_ms" for s in self.stages), *self.counters])
+            for i, row in zip(range(self.frames - len(rows), self.frames), rows):
+                writer.writerow([i, f"{self.frame_ms[row]:.3f}", *(f"{v:.3f}" for v in self.stage_ms[row]), *self.counts[row].tolist()])
+        return path
+
+    def draw(self, surface, font):
+        now = pygame.time.get_ticks()
+        if self.panel is None or now - self.panel_at >= self.refresh_ms:
+            self.panel_at = now
+            self.panel = self.render_panel(font)
+        if self.panel is not None:
+            surface.blit(self.panel, (surface.get_width() - self.panel.get_width() - 10, 10))
+
+    def render_panel(self, font):
+        s = self.summary()
+        if s is None: return None
+        line_h = font.get_linesize()
+        lines = [(f"FPS p50 {s['fps_p50']:5.1f}  1% low {s['fps_p1']:5.1f}", (0, 255, 220)),
+                 (f"frame p50 {s['frame_p50']:5.2f} ms  p99 {s['frame_p99']:5.2f} ms", (220, 230, 255))]
+        lines.append((f"{'stage ms':<10} {'avg':>6} {'max':>6}", (150, 150, 170)))
+        lines += [(f"{name:<10} {s['stages'][name]:6.2f} {s['stage_max'][name]:6.2f}", (230, 230, 230)) for name in self.stages]
+        lines += [(f"{name:<13} {s['counts'][name]:5d}", (180, 200, 255)) for name in self.counters]
+        hist_h = 48
+        w = 280
+        panel = pygame.Surface((w, 16 + line_h * len(lines) + hist_h + 10), pygame.SRCALPHA)
+        panel.fill((6, 8, 14, 200))
+        for i, (text, color) in enumerate(lines):
+            panel.blit(font.render(text, True, color), (8, 8 + i * line_h))
+        hist = s["histogram"]
+        top = 16 + line_h * len(lines)
+        bar_w = (w - 16) / len(hist)
+        peak = max(1, int(hist.max()))
+        for i, count in enumerate(hist.tolist()):
+            h = int(hist_h * count / peak)
+            color = (0, 255, 220) if HIST_BINS[i] < 17 else (255, 200, 0) if HIST_BINS[i] < 34 else (255, 90, 120)
+            pygame.draw.rect(panel, color, (8 + i * bar_w, top + hist_h - h, max(1, bar_w - 1), h))
+        return panel
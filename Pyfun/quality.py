@@ -0,0 +1,62 @@
+from collections import deque
+
+TIERS = {
+    "Low":    {"glow_steps": 0, "particles": 0.3, "particle_cap": 600, "parallax": False, "obstacle_glow": False, "rain_layers": 1},
+    "Medium": {"glow_steps": 3, "particles": 0.6, "particle_cap": 1500, "parallax": True, "obstacle_glow": False, "rain_layers": 2},
+    "High":   {"glow_steps": 6, "particles": 1.0, "particle_cap": 4096, "parallax": True, "obstacle_glow": True, "rain_layers": 3},
+}
+TIER_NAMES = tuple(TIERS)
+PRESETS = ("Auto",) + TIER_NAMES
+
+def _p90(values):
+    return sorted(values)[int(len(values) * 0.9)]
+
+class QualityGovernor:
+    def __init__(self, preset="Auto", budget_ms=1000.0 / 60, window=120, slack=1.15, headroom=0.5, max_patience=16):
+        self.budget_ms = budget_ms
+        self.slack = slack
+        self.headroom = headroom
+        self.max_patience = max_patience
+        self.frames = deque(maxlen=window)
+        self.work = deque(maxlen=window)
+        self.level = len(TIER_NAMES) - 1
+        self.patience = 1
+        self.calm = 0
+        self.set_preset(preset if preset in PRESETS else "Auto")
+
+    @property
+    def name(self): return TIER_NAMES[self.level]
+
+    @property
+    def tier(self): return TIERS[self.name]
+
+    def set_preset(self, preset):
+        self.preset = preset
+        if preset != "Auto": self.level = TIER_NAMES.index(preset)
+        self.frames.clear()
+        self.work.clear()
+        self.calm = 0
+
+    def cycle(self, step=1):
+        self.set_preset(PRESETS[(PRESETS.index(self.preset) + step) % len(PRESETS)])
+
+    def sample(self, frame_ms, work_ms):
+        if self.preset != "Auto": return False
+        self.frames.append(frame_ms)
+        self.work.append(work_ms)
+        if len(self.frames) < self.frames.maxlen: return False
+        slow = _p90(self.frames) > self.budget_ms * self.slack
+        idle = _p90(self.work) < self.budget_ms * self.headroom
+        self.frames.clear()
+        self.work.clear()
+        if slow and self.level > 0:
+            self.level -= 1
+            self.patience = min(self.patience * 2, self.max_patience)
+            self.calm = 0
+            return True
+        self.calm = self.calm + 1 if idle else 0
+        if self.calm >= self.patience and self.level < len(TIER_NAMES) - 1:
+            self.level += 1
+            self.calm = 0
+            return True
+        return False
@@ -0,0 +1,90 @@
+import itertools
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b"MDRP"
+VERSION = 3
+INPUT_BITS = 6
+HEADER = struct.Struct("<4sBHQBB16sIdd")
+REPLAY_DIR = "replays"
+BEST_REPLAY = "best.mdr"
+
+def pack_inputs(inputs, bits=INPUT_BITS):
+    masks = np.asarray(inputs, dtype=np.uint8)
+    planes = (masks[:, None] >> np.arange(bits, dtype=np.uint8)) & 1
+    return np.packbits(planes.ravel(), bitorder="little").tobytes()
+
+def unpack_inputs(data, count, bits=INPUT_BITS):
+    planes = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=count * bits, bitorder="little")
+    return (planes.reshape(count, bits) << np.arange(bits, dtype=np.uint8)).sum(axis=1).astype(np.uint8).tolist()
+
+class Replay:
+    def __init__(self, seed, tick_hz, level_index=0, car_type="Standard", inputs=None):
+        self.seed = seed
+        self.tick_hz = tick_hz
+        self.level_index = level_index
+        self.car_type = car_type
+        self.inputs = [] if inputs is None else inputs
+        self.final_score = 0.0
+        self.final_distance = 0.0
+
+    def __len__(self): return len(self.inputs)
+
+    def record(self, inputs): self.inputs.append(inputs)
+
+    def finish(self, score, distance):
+        self.final_score, self.final_distance = float(score), float(distance)
+
+    def to_bytes(self):
+        header = HEADER.pack(MAGIC, VERSION, self.tick_hz, self.seed, self.level_index, INPUT_BITS,
+                             self.car_type.encode("utf-8")[:16], len(self.inputs), self.final_score, self.final_distance)
+        return header + zlib.compress(pack_inputs(self.inputs), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, tick_hz, seed, level_index, bits, car, count, score, distance = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a Midnight Drag replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        inputs = unpack_inputs(zlib.decompress(data[HEADER.size:]), count, bits)
+        replay = cls(seed, tick_hz, level_index, car.rstrip(b"\0").decode("utf-8"), inputs)
+        replay.finish(score, distance)
+        return replay
+
+    def save(self, path, mode="wb"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, mode) as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+def save_run(replay, directory=REPLAY_DIR):
+    stem = os.path.join(directory, time.strftime("run-%Y%m%d-%H%M%S"))
+    for n in itertools.count():
+        path = f"{stem}-{n}.mdr" if n else f"{stem}.mdr"
+        try:
+            replay.save(path, "xb")
+            break
+        except FileExistsError:
+            continue
+    best_path = os.path.join(directory, BEST_REPLAY)
+    best = load_best(directory)
+    if best is None or replay.final_score > best.final_score:
+        replay.save(best_path)
+    return path
+
+def load_best(directory=REPLAY_DIR):
+    try:
+        return Replay.load(os.path.join(directory, BEST_REPLAY))
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Error loading best replay: {e}")
+        return None
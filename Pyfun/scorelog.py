@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class ScoreLog:
+    def __init__(self, path=None, compact_after=256):
+        self.path = path
+        self.compact_after = compact_after
+        self.pending = OrderedDict()
+        self.acked = 0
+        self.recovered = False
+        self._lock = threading.Lock()
+
+    def recover(self):
+        if self.recovered or not self.path: return
+        self.recovered = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            print(f"Error reading score log: {e}")
+            return
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("op") == "add":
+                self.pending.setdefault(record["id"], record["entry"])
+            elif record.get("op") == "ack":
+                for key in record["ids"]:
+                    if self.pending.pop(key, None) is not None: self.acked += 1
+        if self.pending: print(f"Recovered {len(self.pending)} unsent score(s) from {self.path}.")
+
+    def _write(self, record):
+        if not self.path: return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def new_key(self): return f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:12]}"
+
+    def append(self, entry, key=None):
+        key = key or self.new_key()
+        with self._lock:
+            self._write({"op": "add", "id": key, "entry": entry})
+            self.pending[key] = entry
+        return key
+
+    def batch(self, limit):
+        with self._lock:
+            return dict(list(self.pending.items())[:limit])
+
+    def ack(self, keys):
+        with self._lock:
+            self._write({"op": "ack", "ids": list(keys)})
+            for key in keys:
+                if self.pending.pop(key, None) is not None: self.acked += 1
+            if self.acked >= self.compact_after or not self.pending: self._compact()
+
+    def _compact(self):
+        self.acked = 0
+        if not self.path: return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, entry in self.pending.items():
+                f.write(json.dumps({"op": "add", "id": key, "entry": entry}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def __len__(self): return len(self.pending)
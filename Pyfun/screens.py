@@ -0,0 +1,35 @@
+import pygame
+
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)
+WAKE_EVENT = pygame.event.custom_type()
+
+def wake(*_):
+    try:
+        pygame.event.post(pygame.event.Event(WAKE_EVENT))
+    except pygame.error:
+        pass
+
+class IdleScreen:
+    def __init__(self, surface, max_fps=30, idle_ms=1000):
+        self.surface = surface
+        self.max_fps = max_fps
+        self.idle_ms = idle_ms
+        self.clock = pygame.time.Clock()
+        self.dirty = [surface.get_rect()]
+
+    def invalidate(self, rect=None):
+        self.dirty.append(self.surface.get_rect() if rect is None else pygame.Rect(rect))
+
+    def present(self):
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+    def wait(self, timeout=None):
+        self.present()
+        self.clock.tick(self.max_fps)
+        event = pygame.event.wait(self.idle_ms if timeout is None else max(1, int(timeout)))
+        if event.type == pygame.NOEVENT: return []
+        events = [event] + pygame.event.get()
+        if any(e.type in EXPOSE_EVENTS for e in events): self.invalidate()
+        return events
@@ -0,0 +1,40 @@
+class SpatialHash:
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+
+    def clear(self):
+        self.cells.clear()
+        self.count = 0
+
+    def _span(self, x, y, w, h):
+        cs = self.cell_size
+        return range(int(x) // cs, int(x + w) // cs + 1), range(int(y) // cs, int(y + h) // cs + 1)
+
+    def insert(self, item, rect, tag=None):
+        entry = (self.count, tag, item)
+        self.count += 1
+        xs, ys = self._span(*rect)
+        cells = self.cells
+        for cx in xs:
+            for cy in ys:
+                cell = cells.get((cx, cy))
+                if cell is None: cells[(cx, cy)] = [entry]
+                else: cell.append(entry)
+
+    def insert_point(self, item, x, y, tag=None):
+        self.insert(item, (x, y, 0, 0), tag)
+
+    def query(self, rect, tag=None):
+        found = {}
+        xs, ys = self._span(*rect)
+        cells = self.cells
+        for cx in xs:
+            for cy in ys:
+                cell = cells.get((cx, cy))
+                if cell is None: continue
+                for entry in cell:
+                    if tag is None or entry[1] == tag:
+                        found[entry[0]] = entry[2]
+        return [found[k] for k in sorted(found)]
@@ -0,0 +1,74 @@
+import random
+from collections import deque
+
+from mathutil import clamp
+
+STREAMS = ("traffic", "rival", "orb", "obstacle", "power_up", "destructible")
+POWER_UP_TYPES = ("invincibility", "speed_boost", "score_multiplier")
+RIVAL_RATE = 0.06
+CHUNK = 1500.0
+
+class SpawnTimeline:
+    def __init__(self, params, road_bounds, seed=0, chunk=CHUNK, density=None):
+        self.params = params
+        self.road_left, self.road_right = road_bounds
+        self.seed = seed
+        self.chunk = chunk
+        self.density = {name: 1.0 for name in STREAMS}
+        self.density.update(density or {})
+        self.pace = params["max_spd"]
+        self.rngs = {name: random.Random(f"{seed}/{name}") for name in STREAMS}
+        self.next_at = {name: 0.0 if self.density[name] > 0 else float("inf") for name in STREAMS}
+        self.next_at["rival"] = self._gap("rival", self.rngs["rival"].expovariate(RIVAL_RATE))
+        self.events = deque()
+        self.generated = 0.0
+
+    def __len__(self): return len(self.events)
+
+    def _gap(self, name, seconds):
+        return seconds * self.pace / self.density[name] if self.density[name] > 0 else float("inf")
+
+    def roll(self, name, rng):
+        params, left, right = self.params, self.road_left, self.road_right
+        if name == "traffic":
+            lane_w = (right - left) / 5
+            x = left + rng.randint(0, 4) * lane_w + rng.uniform(0.15, 0.85) * lane_w
+            return clamp(1.1 / params["traffic_rate"], 0.16, 0.9), (x,)
+        if name == "rival":
+            return rng.expovariate(RIVAL_RATE), ()
+        if name == "orb":
+            return clamp(2.1 / params["orb_rate"], 0.35, 2.8), (left + rng.uniform(0.12, 0.88) * (right - left), -30)
+        if name == "obstacle":
+            w, h = rng.randint(30, 80), rng.randint(20, 60)
+            return rng.uniform(1.5, 3.0), (rng.randint(left, right - w), -h, w, h)
+        if name == "power_up":
+            kind = rng.choice(POWER_UP_TYPES)
+            return rng.uniform(5.0, 10.0), (rng.randint(left + 20, right - 20), -50, kind)
+        if name == "destructible":
+            w, h = rng.randint(15, 30), rng.randint(20, 40)
+            x = rng.randint(left - 50, left - w - 10) if rng.random() < 0.5 else rng.randint(right + 10, right + 50 - w)
+            return rng.uniform(0.8, 2.0), (x, -h, w, h)
+        raise ValueError(f"unknown spawn stream {name}")
+
+    def extend(self):
+        end = self.generated + self.chunk
+        batch = []
+        for name in STREAMS:
+            rng, at = self.rngs[name], self.next_at[name]
+            while at < end:
+                seconds, args = self.roll(name, rng)
+                batch.append((at, name, args))
+                at += self._gap(name, seconds)
+            self.next_at[name] = at
+        batch.sort(key=lambda event: event[0])
+        self.events.extend(batch)
+        self.generated = end
+
+    def due(self, distance):
+        while self.generated <= distance: self.extend()
+        events = self.events
+        while events and events[0][0] <= distance: yield events.popleft()
+
+    def peek(self, until):
+        while self.generated < until: self.extend()
+        return [event for event in self.events if event[0] < until]
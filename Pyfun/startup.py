@@ -0,0 +1,23 @@
+import time
+
+START = time.perf_counter()
+marks = []
+reported = False
+
+def mark(label):
+    marks.append((label, time.perf_counter() - START))
+
+def report():
+    lines, prev = [], 0.0
+    for label, t in marks:
+        lines.append(f"  {t * 1000:8.1f} ms  {(t - prev) * 1000:+8.1f} ms  {label}")
+        prev = t
+    return "\n".join(lines)
+
+def first_frame(verbose=False):
+    global reported
+    if reported: return
+    reported = True
+    mark("first frame")
+    print(f"Startup: first frame after {marks[-1][1] * 1000:.0f} ms.")
+    if verbose: print(report())
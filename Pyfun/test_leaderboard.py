@@ -0,0 +1,89 @@
+import json
+import threading
+import time
+
+from leaderboard import LeaderboardCache, LeaderboardError, LeaderboardService
+from scorelog import ScoreLog
+
+class FlakyTransport:
+    status = "ready"
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.entries = {}
+
+    def update(self, entries):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("injected transport failure")
+        self.entries.update(entries)
+
+class EagerFlushLog(ScoreLog):
+    wakeup = None
+
+    def append(self, entry, key=None):
+        key = super().append(entry, key)
+        if self.wakeup is None: return key
+        self.wakeup.set()
+        deadline = time.time() + 2.0
+        while key in self.pending and time.time() < deadline: time.sleep(0.001)
+        return key
+
+def test_submit_during_backoff_resolves():
+    transport = FlakyTransport(failures=1)
+    service = LeaderboardService(transport, log=EagerFlushLog(), backoff=(0.05, 0.1))
+    first = service.submit("first", 10)
+    assert first.exception(timeout=2.0) is not None
+
+    service.log.wakeup = service.wakeup
+    second = service.submit("second", 20)
+    assert second.result(timeout=2.0) in transport.entries
+    assert len(transport.entries) == 2
+    assert not service.log.pending
+    service.close()
+
+def test_cache_saves_while_merging(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = LeaderboardCache(limit=500, path=path)
+    errors = []
+
+    def feed():
+        try:
+            for i in range(300): cache.merge({f"feed-{i}": {"name": "feed", "score": i}})
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=feed)
+    thread.start()
+    for i in range(300): cache.add_pending({f"local-{i}": {"name": "local", "score": i}})
+    thread.join()
+    assert not errors
+    with open(path) as f:
+        assert len(json.load(f)["entries"]) == 500
+
+class OfflineTransport(FlakyTransport):
+    status = "offline"
+
+    def __init__(self):
+        super().__init__(failures=0)
+
+    def update(self, entries):
+        if self.status == "offline": raise LeaderboardError("Firebase unavailable")
+        super().update(entries)
+
+def test_submit_offline_keeps_score_in_log(tmp_path):
+    path = str(tmp_path / "scores.wal")
+    transport = OfflineTransport()
+    service = LeaderboardService(transport, log=ScoreLog(path), backoff=(0.05, 0.1))
+    request = service.submit("offline", 30)
+    assert request.exception(timeout=2.0) is not None
+
+    recovered = ScoreLog(path)
+    recovered.recover()
+    assert list(recovered.pending.values()) == [{"name": "offline", "score": 30}]
+
+    transport.status = "ready"
+    deadline = time.time() + 2.0
+    while service.log.pending and time.time() < deadline: time.sleep(0.01)
+    assert list(transport.entries.values()) == [{"name": "offline", "score": 30}]
+    service.close()
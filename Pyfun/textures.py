@@ -0,0 +1,84 @@
+import random
+from functools import lru_cache
+
+import numpy as np
+import pygame
+
+def display_convert(surf, alpha=False):
+    if pygame.display.get_surface() is None: return surf
+    return surf.convert_alpha() if alpha else surf.convert()
+
+def _rgb_surface(rgb):
+    surf = pygame.Surface(rgb.shape[:2])
+    pygame.surfarray.blit_array(surf, rgb)
+    return display_convert(surf)
+
+def _rgba_surface(rgb, alpha):
+    surf = pygame.Surface(rgb.shape[:2], pygame.SRCALPHA)
+    pixels = pygame.surfarray.pixels3d(surf)
+    pixels[...] = rgb
+    del pixels
+    pixels = pygame.surfarray.pixels_alpha(surf)
+    pixels[...] = alpha
+    del pixels
+    return display_convert(surf, alpha=True)
+
+def gradient_column(h, top_color, bottom_color):
+    t = np.arange(h, dtype=np.float64)[:, None] / max(1, h - 1)
+    top = np.array(top_color[:3], dtype=np.float64)
+    bottom = np.array(bottom_color[:3], dtype=np.float64)
+    return (top + (bottom - top) * t).astype(np.uint8)
+
+def _gradient_rgb(w, h, top_color, bottom_color):
+    return np.ascontiguousarray(np.broadcast_to(gradient_column(h, top_color, bottom_color)[None], (w, h, 3)))
+
+@lru_cache(maxsize=64)
+def _vertical_gradient(size, top_color, bottom_color):
+    return _rgb_surface(_gradient_rgb(*size, top_color, bottom_color))
+
+def vertical_gradient(size, top_color, bottom_color):
+    return _vertical_gradient(tuple(size), tuple(top_color), tuple(bottom_color))
+
+def _star_positions(w, max_y, count, seed):
+    rng = random.Random(seed)
+    xs, ys = np.empty(count, dtype=np.intp), np.empty(count, dtype=np.intp)
+    for i in range(count):
+        xs[i] = rng.randint(0, w)
+        ys[i] = rng.randint(0, max_y)
+    return xs, ys
+
+@lru_cache(maxsize=32)
+def _starfield(size, count, color, seed, star_size, max_y):
+    w, h = size
+    xs, ys = _star_positions(w, h - 1 if max_y is None else max_y, count, seed)
+    offsets = np.arange(star_size)
+    px = (xs[:, None, None] + offsets[None, :, None]).repeat(star_size, axis=2).ravel()
+    py = (ys[:, None, None] + offsets[None, None, :]).repeat(star_size, axis=1).ravel()
+    keep = (px < w) & (py < h)
+    alpha = np.zeros((w, h), dtype=np.uint8)
+    alpha[px[keep], py[keep]] = 255
+    rgb = np.empty((w, h, 3), dtype=np.uint8)
+    rgb[...] = color
+    return _rgba_surface(rgb, alpha)
+
+def starfield(size, count, color, seed=0, star_size=2, max_y=None):
+    return _starfield(tuple(size), count, tuple(color), seed, star_size, max_y)
+
+@lru_cache(maxsize=16)
+def _water_bands(size, top_color, bottom_color, band_color, bands, seed):
+    w, h = size
+    rng = np.random.default_rng(seed)
+    rgb = _gradient_rgb(w, h, top_color, bottom_color).astype(np.float64)
+    x = np.arange(w, dtype=np.float64)[:, None]
+    y = np.arange(h, dtype=np.float64)[None, :]
+    phase = rng.uniform(0, 2 * np.pi, size=bands)
+    wave = np.zeros((w, h))
+    for i in range(bands):
+        freq = (i + 1) * np.pi / max(1, h)
+        wave += np.sin(y * freq * 6 + x * 0.02 * (i + 1) + phase[i])
+    k = np.clip(wave / bands, 0, 1)[..., None] * (y / max(1, h))[..., None]
+    rgb += (np.array(band_color, dtype=np.float64) - rgb) * k * 0.5
+    return _rgb_surface(rgb.astype(np.uint8))
+
+def water_bands(size, top_color, bottom_color, band_color, bands=3, seed=0):
+    return _water_bands(tuple(size), tuple(top_color), tuple(bottom_color), tuple(band_color), bands, seed)
@@ -0,0 +1,51 @@
+import pygame
+
+from atlas import LRUSpriteCache
+
+SCALES = (0.5, 0.6, 0.75, 0.85, 1.0)
+
+def px(value, scale): return max(1, round(value * scale))
+
+def parse_scale(text):
+    try:
+        value = float(text.strip().rstrip("%"))
+    except ValueError:
+        return 1.0
+    if value > 1.0: value /= 100.0
+    return min(SCALES[-1], max(SCALES[0], value))
+
+_sprites = LRUSpriteCache(capacity=256)
+
+def scaled_sprite(surface, scale):
+    if scale == 1.0: return surface
+    w, h = surface.get_size()
+    sprite = _sprites.get((surface, scale), lambda: pygame.transform.smoothscale(surface, (px(w, scale), px(h, scale))))
+    if sprite.get_alpha() != surface.get_alpha(): sprite.set_alpha(surface.get_alpha())
+    return sprite
+
+class Viewport:
+    def __init__(self, scale=1.0):
+        self.canvas = None
+        self.set_scale(scale)
+
+    @property
+    def label(self): return f"{round(self.scale * 100)}%"
+
+    def set_scale(self, scale):
+        self.scale = min(SCALES[-1], max(SCALES[0], scale))
+        self.canvas = None
+
+    def cycle(self, step=1):
+        nearest = min(range(len(SCALES)), key=lambda i: abs(SCALES[i] - self.scale))
+        self.set_scale(SCALES[(nearest + step) % len(SCALES)])
+
+    def target(self, screen):
+        if self.scale == 1.0: return screen
+        w, h = screen.get_size()
+        size = (round(w * self.scale), round(h * self.scale))
+        if self.canvas is None or self.canvas.get_size() != size:
+            self.canvas = pygame.Surface(size, 0, screen)
+        return self.canvas
+
+    def present(self, screen, target):
+        if target is not screen: pygame.transform.scale(target, screen.get_size(), screen)
@@ -0,0 +1,100 @@
+import random
+from functools import lru_cache
+
+import pygame
+
+from textures import display_convert
+
+COLORKEY = (255, 0, 255)
+RAIN_LAYERS = (
+    (160, (-3, 6), (80, 80, 120), 1, (-140, 280)),
+    (90, (-5, 10), (150, 150, 200), 1, (-260, 520)),
+    (28, (-8, 16), (200, 200, 235), 2, (-420, 840)),
+)
+FOG_COLOR = (180, 180, 180)
+FOG_ALPHA = 80
+PUDDLE_COLOR = (50, 50, 70)
+PUDDLES = 6
+ALPHA_STEP = 15
+
+def _keyed_surface(size):
+    surf = pygame.Surface(size)
+    surf.fill(COLORKEY)
+    return surf
+
+def _keyed(surf):
+    surf = display_convert(surf)
+    surf.set_colorkey(COLORKEY, pygame.RLEACCEL)
+    return surf
+
+@lru_cache(maxsize=8)
+def rain_sheet(size, count, streak, color, width, seed):
+    w, h = size
+    dx, dy = streak
+    rng = random.Random(seed)
+    surf = _keyed_surface(size)
+    for _ in range(count):
+        x, y = rng.randrange(w), rng.randrange(h)
+        for ox in (-w, 0, w):
+            for oy in (-h, 0, h):
+                pygame.draw.line(surf, color, (x + ox, y + oy), (x + ox + dx, y + oy + dy), width)
+    return _keyed(surf)
+
+@lru_cache(maxsize=8)
+def puddle_sheet(size, count, seed, scale=1.0):
+    w, h = size
+    rng = random.Random(seed)
+    surf = _keyed_surface(size)
+    for _ in range(count):
+        r = max(1, round(rng.randint(10, 30) * scale))
+        x, y = rng.randint(r, w - r), rng.randrange(h)
+        for oy in (-h, 0, h):
+            pygame.draw.ellipse(surf, PUDDLE_COLOR, (x - r, y + oy - r // 2, r * 2, r))
+    return _keyed(surf)
+
+@lru_cache(maxsize=4)
+def fog_overlay(size):
+    surf = pygame.Surface(size)
+    surf.fill(FOG_COLOR)
+    return display_convert(surf)
+
+def _fade(surf, intensity, alpha=255):
+    a = int(alpha * intensity) // ALPHA_STEP * ALPHA_STEP if intensity < 1.0 else alpha
+    if surf.get_alpha() != a: surf.set_alpha(a, pygame.RLEACCEL)
+    return a
+
+def _blit_wrapped(surface, sheet, x, y):
+    w, h = sheet.get_size()
+    x, y = int(x) % w, int(y) % h
+    surface.blits([(sheet, (x - w, y - h)), (sheet, (x, y - h)), (sheet, (x - w, y)), (sheet, (x, y))], doreturn=False)
+
+def _rain_layer(layer, scale):
+    count, (dx, dy), color, width, (vx, vy) = layer
+    if scale == 1.0: return layer
+    return (max(1, round(count * scale * scale)), (round(dx * scale), round(dy * scale)), color,
+            max(1, round(width * scale)), (vx * scale, vy * scale))
+
+def draw_rain(surface, t, intensity=1.0, layers=len(RAIN_LAYERS), seed=0, scale=1.0):
+    size, skip = surface.get_size(), len(RAIN_LAYERS) - layers
+    for i, layer in enumerate(RAIN_LAYERS[skip:], skip):
+        count, streak, color, width, (vx, vy) = _rain_layer(layer, scale)
+        sheet = rain_sheet(size, count, streak, color, width, seed + i)
+        if _fade(sheet, intensity): _blit_wrapped(surface, sheet, t * vx, t * vy)
+
+def draw_fog(surface, intensity=1.0):
+    overlay = fog_overlay(surface.get_size())
+    if _fade(overlay, intensity, FOG_ALPHA): surface.blit(overlay, (0, 0))
+
+def draw_puddles(surface, left, right, scroll, intensity=1.0, count=PUDDLES, seed=0, scale=1.0):
+    h = surface.get_height()
+    sheet = puddle_sheet((right - left, h), count, seed, scale)
+    if not _fade(sheet, intensity): return
+    y = int(scroll) % h
+    surface.blits([(sheet, (left, y - h)), (sheet, (left, y))], doreturn=False)
+
+def warm(size, road_bounds, seed=0, scale=1.0):
+    for i, layer in enumerate(RAIN_LAYERS):
+        count, streak, color, width, _ = _rain_layer(layer, scale)
+        rain_sheet(size, count, streak, color, width, seed + i)
+    puddle_sheet((road_bounds[1] - road_bounds[0], size[1]), PUDDLES, seed, scale)
+    fog_overlay(size)